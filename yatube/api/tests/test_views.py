@@ -0,0 +1,125 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author, group=cls.group)
+            for i in range(13)
+        )
+        cls.post = Post.objects.create(
+            text='Последний', author=cls.author, group=cls.group)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_and_payloads(self):
+        """Ответы повторяют страницы сайта и листаются курсором."""
+        pages = {
+            reverse('api:index'): 10,
+            reverse('api:group_list', kwargs={'slug': 'group'}): 10,
+            reverse('api:profile', kwargs={'username': 'author'}): 10,
+        }
+        for address, size in pages.items():
+            with self.subTest(address=address):
+                data = self.client.get(address).json()
+                second = self.client.get(
+                    address, {'cursor': data['next']}).json()
+                self.assertEqual(len(data['results']), size)
+                self.assertEqual(len(second['results']), 4)
+                self.assertEqual(data['results'][0]['text'], 'Последний')
+                self.assertEqual(data['results'][0]['group'], 'group')
+
+        data = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': ApiTest.post.id})
+        ).json()
+        self.assertEqual(data['post']['author'], 'author')
+        self.assertEqual(data['comments']['results'], [])
+
+    def test_not_modified(self):
+        """Неизмененная лента отдает 304, новый пост меняет ETag."""
+        address = reverse('api:index')
+        response = self.client.get(address)
+        etag = response['ETag']
+
+        self.assertEqual(
+            self.client.get(address, HTTP_IF_NONE_MATCH=etag).status_code,
+            304)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        Post.objects.create(text='Новый', author=ApiTest.author)
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_detail_etag_changes_with_comments(self):
+        address = reverse(
+            'api:post_detail', kwargs={'post_id': ApiTest.post.id})
+        etag = self.client.get(address)['ETag']
+        Comment.objects.create(
+            post=ApiTest.post, author=ApiTest.reader, text='Коммент')
+
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['comments']['results']), 1)
+
+    def test_follow_index(self):
+        """Лента подписок доступна только после входа."""
+        address = reverse('api:follow_index')
+        self.assertEqual(self.client.get(address).status_code, 401)
+
+        self.client.force_login(ApiTest.reader)
+        response = self.client.get(address)
+        self.assertEqual(len(response.json()['results']), 10)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(
+            self.client.get(
+                address, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+            304)
+
+    def test_follow_index_etag_changes_with_follows(self):
+        """Подписка и отписка меняют ETag, даже если посты автора
+        старше ленты."""
+        other = User.objects.create_user(username='other')
+        Post.objects.filter(pk=Post.objects.create(
+            text='Старый пост', author=other).pk).update(
+                pub_date=timezone.now() - timedelta(days=365))
+        address = reverse('api:follow_index')
+        self.client.force_login(ApiTest.reader)
+
+        for change in (
+            lambda: Follow.objects.create(user=ApiTest.reader, author=other),
+            lambda: Follow.objects.filter(
+                user=ApiTest.reader, author=other).delete(),
+        ):
+            etag = self.client.get(address)['ETag']
+            change()
+            response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_missing_objects(self):
+        self.assertEqual(
+            self.client.get(
+                reverse('api:group_list', kwargs={'slug': 'missing'})
+            ).status_code,
+            404)
+        self.assertEqual(
+            self.client.get(
+                reverse('api:post_detail', kwargs={'post_id': 0})
+            ).status_code,
+            404)
@@ -0,0 +1,122 @@
+"""JSON-версия страниц ленты для мобильных клиентов.
+
+Ответы поддерживают условные запросы (core.conditional): на
+If-None-Match или If-Modified-Since неизмененная лента отдает 304
+без выборки постов.
+"""
+from functools import wraps
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_GET
+
+from core.conditional import conditional
+from core.paginator import KeysetPaginator
+from core.routers import read_from_replica
+from posts.feed import get_follow_feed
+from posts.freshness import (follow_state, group_state, index_state,
+                             post_state, profile_state)
+from posts.models import Comment, Group, Post, User
+from posts.serializers import comment_data, group_data, post_data
+
+PAGE_SIZE = 10
+COMMENTS_PAGE_SIZE = 20
+JSON_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def _page(request, queryset, serialize, per_page=PAGE_SIZE):
+    page = KeysetPaginator(queryset, per_page).get_page(
+        request.GET.get('cursor'))
+    return {
+        'results': [serialize(obj) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def api_login_required(view):
+    """Как login_required, но вместо редиректа отвечает 401."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _json({'detail': 'Требуется авторизация.'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@require_GET
+@cache_control(no_cache=True)
+@read_from_replica
+@conditional(index_state)
+def index(request):
+    """Последние посты всех авторов."""
+    return _json(_page(request, Post.objects.for_feed(), post_data))
+
+
+@require_GET
+@cache_control(no_cache=True)
+@read_from_replica
+@conditional(group_state)
+def group_posts(request, slug):
+    """Группа и ее последние посты."""
+    group = get_object_or_404(Group, slug=slug)
+    data = _page(request, group.posts.for_feed(), post_data)
+    data['group'] = dict(group_data(group), description=group.description)
+    return _json(data)
+
+
+@require_GET
+@cache_control(no_cache=True)
+@read_from_replica
+@conditional(profile_state)
+def profile(request, username):
+    """Автор, его счетчики и последние посты."""
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    data = _page(request, author.posts.for_feed(), post_data)
+    data['author'] = {
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'posts_count': author.stats.posts_count,
+        'followers_count': author.stats.followers_count,
+        'following_count': author.stats.following_count,
+    }
+    return _json(data)
+
+
+@require_GET
+@cache_control(no_cache=True)
+@read_from_replica
+@conditional(post_state)
+def post_detail(request, post_id):
+    """Пост и страница его комментариев, cursor листает комментарии."""
+    post = get_object_or_404(Post.objects.for_detail(), id=post_id)
+    data = {
+        'post': dict(post_data(post), comments_count=post.comments_count),
+        'comments': _page(
+            request, Comment.objects.for_post(post.id), comment_data,
+            COMMENTS_PAGE_SIZE),
+    }
+    return _json(data)
+
+
+@require_GET
+@api_login_required
+@cache_control(private=True, no_cache=True)
+@read_from_replica
+@conditional(follow_state)
+def follow_index(request):
+    """Лента подписок текущего пользователя."""
+    paginator = KeysetPaginator(
+        get_follow_feed(request.user), PAGE_SIZE)
+    page = paginator.get_page(request.GET.get('cursor'))
+    return _json({
+        'results': [post_data(entry.post) for entry in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
@@ -0,0 +1,15 @@
+"""Окружение pytest, как у core.test_runner.YatubeRunner."""
+import pytest
+
+from core.test_runner import add_test_replica, enable_strict_query_check
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(
+        django_db_modify_db_settings_parallel_suffix):
+    add_test_replica()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def strict_query_check(django_test_environment):
+    enable_strict_query_check()
@@ -0,0 +1,173 @@
+"""ASGI-обертка над WSGI-приложением Django.
+
+Django 2.2 не умеет ASGI, поэтому приложение по-прежнему
+синхронное, а обертка запускает его в пуле из ASGI_THREADS потоков:
+вся работа с ORM идет вне цикла событий. Медленные клиенты
+обслуживает ASGI-сервер: тело запроса читается и ответ отправляется
+в цикле событий, поток пула занят только на время вычисления ответа.
+
+Потоковые ответы (SSE) ждут событий внутри генератора и держат поток
+все время жизни, поэтому читаются по одному куску в отдельном пуле
+из stream_threads потоков: открытые вкладки не отнимают потоки
+у обычных запросов. Если клиент отключился, чтение потока
+прекращается после текущего куска.
+"""
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+_END = object()
+
+
+def build_environ(scope, body):
+    """WSGI environ из ASGI scope и прочитанного тела запроса."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            # Куки из нескольких заголовков склеиваются, как в одном.
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    return environ
+
+
+class WsgiToAsgi:
+    """ASGI-приложение, которое вызывает WSGI-приложение в пуле потоков."""
+
+    def __init__(self, wsgi_application, threads, stream_threads=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='asgi')
+        self.stream_executor = ThreadPoolExecutor(
+            max_workers=stream_threads or threads,
+            thread_name_prefix='asgi-stream')
+
+    def close(self, wait=True):
+        self.executor.shutdown(wait=wait)
+        self.stream_executor.shutdown(wait=wait)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.close(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def wait_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    def call(self, environ):
+        """Вызывает приложение в потоке пула.
+
+        Обычный ответ целиком собирается и закрывается в том же потоке,
+        чтобы request_finished закрыл соединения с базой этого потока.
+        """
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        result = self.wsgi_application(environ, start_response)
+        if getattr(result, 'streaming', False):
+            return started, None, result
+        try:
+            return started, b''.join(result), None
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        started, content, stream = await loop.run_in_executor(
+            self.executor, self.call, build_environ(scope, body))
+        await send({
+            'type': 'http.response.start',
+            'status': started['status'],
+            'headers': started['headers'],
+        })
+        if stream is None:
+            await send({'type': 'http.response.body', 'body': content})
+            return
+        await self.send_stream(stream, receive, send)
+
+    async def send_stream(self, stream, receive, send):
+        loop = asyncio.get_running_loop()
+        chunks = iter(stream)
+        disconnected = asyncio.ensure_future(self.wait_disconnect(receive))
+        chunk = None
+        try:
+            while True:
+                chunk = loop.run_in_executor(
+                    self.stream_executor, next, chunks, _END)
+                await asyncio.wait(
+                    (chunk, disconnected),
+                    return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    return
+                if chunk.result() is _END:
+                    break
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk.result(),
+                    'more_body': True,
+                })
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            # Генератор нельзя закрыть, пока он выполняется в потоке.
+            if chunk is not None:
+                await asyncio.wait((chunk,))
+            await loop.run_in_executor(self.stream_executor, stream.close)
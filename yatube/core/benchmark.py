@@ -0,0 +1,72 @@
+"""Общие средства команд-бенчмарков: перцентили, результаты в JSON
+и сравнение с результатами предыдущего коммита."""
+import json
+import math
+import subprocess
+
+from django.conf import settings
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(values, q):
+    """q-й перцентиль отсортированного списка (nearest rank)."""
+    if not values:
+        return None
+    rank = max(math.ceil(len(values) * q / 100), 1)
+    return values[rank - 1]
+
+
+def summarize(latencies, elapsed):
+    """Задержки в мс по перцентилям и пропускная способность."""
+    latencies = sorted(latencies)
+    summary = {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed if elapsed else None,
+        'mean_ms': (
+            sum(latencies) / len(latencies) * 1000 if latencies else None),
+    }
+    for q in PERCENTILES:
+        value = percentile(latencies, q)
+        summary[f'p{q}_ms'] = value * 1000 if value is not None else None
+    summary['max_ms'] = latencies[-1] * 1000 if latencies else None
+    return summary
+
+
+def git_commit():
+    """Текущий коммит репозитория или None вне git."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save(results, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def compare(baseline, results, metric='p95_ms', threshold=0.2):
+    """Строки (view, было, стало, изменение) по представлениям обоих
+    прогонов и список представлений, где metric вырос больше threshold.
+    """
+    rows = []
+    regressions = []
+    for view, summary in results['views'].items():
+        before = baseline['views'].get(view, {}).get(metric)
+        after = summary.get(metric)
+        if not before or after is None:
+            continue
+        change = after / before - 1
+        rows.append((view, before, after, change))
+        if change > threshold:
+            regressions.append(view)
+    return rows, regressions
@@ -0,0 +1,160 @@
+"""Простой pub/sub для уведомлений о новых записях.
+
+Брокер публикует сообщения в именованные каналы и выдает подписки
+на несколько каналов сразу. Реализация выбирается настройкой
+PUBSUB_BACKEND (путь к классу):
+
+- LocalBroker — очереди в памяти процесса, без задержек, но
+  уведомления не выходят за пределы одного процесса;
+- CacheBroker — каналы в общем кеше из settings.CACHES, работает
+  между процессами, подписчик опрашивает кеш раз в POLL_INTERVAL.
+
+Другой бэкенд (например, Redis) должен реализовать publish(channel,
+message) и subscribe(channels), где подписка умеет get(timeout),
+возвращающий пару (channel, message) или None, и close().
+"""
+import queue
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+
+class LocalSubscription:
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.queue = queue.SimpleQueue()
+
+    def get(self, timeout=None):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LocalBroker:
+    """Брокер в памяти текущего процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.queue.put((channel, message))
+
+    def subscribe(self, channels):
+        subscription = LocalSubscription(self, channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscriptions = self._subscriptions.get(channel)
+                if subscriptions is None:
+                    continue
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[channel]
+
+
+class CacheSubscription:
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.pending = []
+        self.seen = self.broker.positions(self.channels)
+
+    def _poll(self):
+        positions = self.broker.positions(self.channels)
+        for channel, position in positions.items():
+            seen = self.seen[channel]
+            if position <= seen:
+                continue
+            keys = [
+                self.broker.message_key(channel, number)
+                for number in range(seen + 1, position + 1)
+            ]
+            # Сообщение может еще не успеть записаться или уже истечь:
+            # факт публикации важнее, вместо него отдается None.
+            messages = cache.get_many(keys)
+            self.pending.extend((channel, messages.get(key)) for key in keys)
+            self.seen[channel] = position
+
+    def get(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if not self.pending:
+                self._poll()
+            if self.pending:
+                return self.pending.pop(0)
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(self.broker.POLL_INTERVAL)
+
+    def close(self):
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CacheBroker:
+    """Брокер поверх общего кеша: номер последнего сообщения канала
+    и сами сообщения хранятся отдельными ключами."""
+
+    POLL_INTERVAL = 0.5
+    MESSAGE_TIMEOUT = 60
+
+    def position_key(self, channel):
+        return f'pubsub:{channel}'
+
+    def message_key(self, channel, number):
+        return f'pubsub:{channel}:{number}'
+
+    def positions(self, channels):
+        keys = {self.position_key(channel): channel for channel in channels}
+        values = cache.get_many(keys)
+        return {
+            channel: values.get(key, 0) for key, channel in keys.items()
+        }
+
+    def publish(self, channel, message):
+        key = self.position_key(channel)
+        cache.add(key, 0, None)
+        number = cache.incr(key)
+        cache.set(
+            self.message_key(channel, number), message, self.MESSAGE_TIMEOUT)
+
+    def subscribe(self, channels):
+        return CacheSubscription(self, channels)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """Брокер из settings.PUBSUB_BACKEND, один на процесс."""
+    return import_string(settings.PUBSUB_BACKEND)()
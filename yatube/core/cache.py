@@ -0,0 +1,181 @@
+"""Кеширование с защитой от лавины запросов (cache stampede).
+
+get_or_set хранит вместе со значением время его вычисления и срок
+жизни. Незадолго до истечения срока значение с растущей вероятностью
+пересчитывается заранее (probabilistic early recomputation, XFetch),
+а при промахе вычислять его идет только один процесс: остальные
+ждут результат под блокировкой в том же кеше (request coalescing).
+Работает с любым общим бэкендом из settings.CACHES.
+"""
+import math
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .metrics import current as current_request
+
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+
+class CacheMetrics:
+    """Счетчики обращений к кешу текущего процесса.
+
+    События группируются по имени кеша: page, card и т.д.
+    и дублируются в метрики текущего запроса (core.metrics).
+    """
+
+    EVENTS = ('hit', 'miss', 'early', 'coalesced', 'stale')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def record(self, name, event, count=1):
+        with self._lock:
+            self._counts[name, event] += count
+        stats = current_request()
+        if stats is not None:
+            stats.cache[name, event] += count
+
+    def snapshot(self):
+        with self._lock:
+            names = {name for name, _ in self._counts}
+            return {
+                name: {
+                    event: self._counts[name, event]
+                    for event in self.EVENTS
+                }
+                for name in sorted(names)
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+metrics = CacheMetrics()
+
+
+def _store(key, compute, timeout):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    cache.set(key, (value, delta, time.time() + timeout), timeout)
+    return value
+
+
+@contextmanager
+def lock(key, timeout=LOCK_TIMEOUT):
+    """Взаимное исключение по key через cache.add.
+
+    Если блокировку не удалось получить за timeout, блок выполняется
+    без нее: держатель, скорее всего, упал, не сняв ее.
+    """
+    lock_key = f'lock:{key}'
+    deadline = time.monotonic() + timeout
+    acquired = cache.add(lock_key, 1, timeout)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        acquired = cache.add(lock_key, 1, timeout)
+    try:
+        yield
+    finally:
+        if acquired:
+            cache.delete(lock_key)
+
+
+def get_or_set(key, compute, timeout, beta=1.0, name='default'):
+    """Значение из кеша или compute() с защитой от лавины."""
+    return _resolve(key, cache.get(key), compute, timeout, beta, name)
+
+
+def get_many_or_set(computes, timeout, beta=1.0, name='default'):
+    """get_or_set для словаря {ключ: compute}.
+
+    Записи читаются одним get_many, а промахи и досрочные пересчеты
+    идут по одному под блокировкой, как в get_or_set.
+    """
+    entries = cache.get_many(computes)
+    return {
+        key: _resolve(key, entries.get(key), compute, timeout, beta, name)
+        for key, compute in computes.items()
+    }
+
+
+def _resolve(key, entry, compute, timeout, beta, name):
+    lock_key = f'lock:{key}'
+    if entry is not None:
+        value, delta, expires = entry
+        jitter = -delta * beta * math.log(1 - random.random())
+        if time.time() + jitter < expires:
+            metrics.record(name, 'hit')
+            return value
+        metrics.record(name, 'early')
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            metrics.record(name, 'stale')
+            return value
+        try:
+            return _store(key, compute, timeout)
+        finally:
+            cache.delete(lock_key)
+
+    metrics.record(name, 'miss')
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            return _store(key, compute, timeout)
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            metrics.record(name, 'coalesced')
+            return entry[0]
+    return _store(key, compute, timeout)
+
+
+def shared_cache_page(timeout, version_keys=()):
+    """Замена cache_page для страниц-оболочек (см. core.holes).
+
+    Оболочка одинакова для всех, поэтому один кешированный ответ
+    отдается и гостям, и пользователям. Ответ кешируется через
+    get_or_set, поэтому холодный кеш не вызывает лавину запросов
+    к базе. В ключ входят значения version_keys, так что сброс
+    версии сразу делает страницу свежей.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            versions = cache.get_many(version_keys)
+            key = 'page:{}:{}'.format(
+                request.get_full_path(),
+                ':'.join(str(versions.get(name)) for name in version_keys))
+            uncached = []
+
+            def compute():
+                response = view(request, *args, **kwargs)
+                uncached.append(response)
+                if response.status_code != 200:
+                    return None
+                return response.content, response['Content-Type']
+
+            cached = get_or_set(key, compute, timeout, name='page')
+            if uncached:
+                return uncached[0]
+            if cached is None:
+                return view(request, *args, **kwargs)
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        return wrapper
+    return decorator
@@ -0,0 +1,79 @@
+"""Условные ответы и заголовки кеширования для представлений.
+
+Состояние страницы описывает функция state(request, *args, **kwargs),
+которая до отрисовки дешево вычисляет пару (ETag, Last-Modified)
+или (None, None), если объекта нет. По ней condition() отвечает 304
+на If-None-Match и If-Modified-Since, не вызывая само представление.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+
+def make_etag(*parts):
+    return hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def conditional(state):
+    """condition() с ETag и Last-Modified из одного вызова state."""
+    def cached_state(request, *args, **kwargs):
+        if not hasattr(request, '_conditional_state'):
+            request._conditional_state = state(request, *args, **kwargs)
+        return request._conditional_state
+
+    def etag(request, *args, **kwargs):
+        return cached_state(request, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return cached_state(request, *args, **kwargs)[1]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def conditional_page(state, max_age=None, shared=False):
+    """conditional() и Cache-Control для HTML-страниц.
+
+    Страница гостя одинакова для всех, её можно держать в общем
+    кеше max_age секунд (по умолчанию PUBLIC_PAGE_MAX_AGE).
+    Страница пользователя зависит от него: в ETag добавляется его id,
+    Last-Modified не отдается, а кешировать её может только браузер,
+    сверяясь с сервером перед показом.
+
+    shared=True — страница-оболочка (core.holes), одна для всех.
+    Её держит общий кеш, а браузер каждый раз сверяет ETag, чтобы
+    после своих правок пользователь сразу видел свежую версию.
+    Представление не трогает сессию, и Vary: Cookie не нужен.
+    """
+    def personal_state(request, *args, **kwargs):
+        etag, last_modified = state(request, *args, **kwargs)
+        if shared or etag is None or not request.user.is_authenticated:
+            return etag, last_modified
+        return make_etag(etag, request.user.pk), None
+
+    def decorator(view):
+        conditional_view = conditional(personal_state)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if (request.method not in ('GET', 'HEAD')
+                    or response.status_code not in (200, 304)):
+                return response
+            public_max_age = max_age or settings.PUBLIC_PAGE_MAX_AGE
+            if shared:
+                patch_cache_control(
+                    response, public=True, max_age=0, s_maxage=public_max_age)
+                return response
+            patch_vary_headers(response, ('Cookie',))
+            if (request.user.is_authenticated
+                    or request.META.get('CSRF_COOKIE_USED')):
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(
+                    response, public=True, max_age=public_max_age)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,9 @@
+from django.conf import settings
+
+
+def events(request):
+    """Как страница узнает о новых постах: поток SSE или long-poll."""
+    return {
+        'events_streaming': settings.EVENTS_STREAMING,
+        'events_poll_interval': settings.EVENTS_POLL_INTERVAL_MS,
+    }
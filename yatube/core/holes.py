@@ -0,0 +1,61 @@
+"""Персональные фрагменты («дыры») в общих для всех страницах.
+
+Страница-оболочка (shell) одинакова для гостей и пользователей и
+кешируется целиком. Все, что зависит от пользователя: меню в шапке,
+кнопка подписки, форма комментария, — регистрируется здесь как
+фрагмент. В оболочке вместо него выводится гостевой вариант
+в <div data-hole>, а скрипт из base.html одним запросом к
+core.views.holes получает версии для текущего пользователя.
+На обычных страницах фрагмент сразу рисуется для пользователя.
+"""
+from inspect import signature
+
+from django.contrib.auth.models import AnonymousUser
+from django.template.loader import render_to_string
+
+_registry = {}
+
+
+def register(name, template):
+    """Регистрирует фрагмент name.
+
+    Декорируемая функция get_context(user, **params) возвращает
+    контекст шаблона или None, если выводить нечего.
+    """
+    def decorator(get_context):
+        _registry[name] = (template, get_context)
+        return get_context
+    return decorator
+
+
+def accepts(name, params):
+    """Зарегистрирован ли фрагмент name и подходят ли ему params.
+
+    Параметры приходят из запроса, и лишний или пропущенный
+    не должен превращаться в TypeError и ответ 500.
+    """
+    if name not in _registry:
+        return False
+    try:
+        signature(_registry[name][1]).bind(None, **params)
+    except TypeError:
+        return False
+    return True
+
+
+def render_hole(name, params, request=None):
+    """HTML фрагмента для пользователя запроса или для гостя без него."""
+    template, get_context = _registry[name]
+    user = request.user if request is not None else AnonymousUser()
+    context = get_context(user, **params)
+    if context is None:
+        return ''
+    context.setdefault('user', user)
+    return render_to_string(template, context, request=request)
+
+
+@register('user_menu', 'includes/holes/user_menu.html')
+def user_menu(user, view_name=''):
+    """view_name — представление страницы: в /holes/ resolver_match
+    указывает на сам core.views.holes."""
+    return {'view_name': view_name}
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WsgiToAsgi, build_environ
+from core.benchmark import summarize
+
+
+def _scope(path):
+    url = urlsplit(path)
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': url.path,
+        'query_string': url.query.encode(),
+        'headers': [(b'host', b'localhost')],
+        'server': ('localhost', 80),
+    }
+
+
+def _summary(mode, latencies, elapsed):
+    return {'mode': mode, **summarize(latencies, elapsed)}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность WSGI и ASGI (yatube/asgi.py) '
+        'при медленных клиентах. Оба режима обслуживают запросы '
+        'одинаковым числом потоков (workers), одновременно открыто не '
+        'больше clients запросов; медленный клиент читает каждый '
+        'ответ client-delay секунд. Задержка в обоих режимах считается '
+        'с момента, когда запрос поставлен в очередь клиентов. Это '
+        'модель, а не замер настоящих серверов: приложения вызываются '
+        'в этом же процессе без сети, '
+        'а медленный клиент — пауза после ответа (WSGI) или в send '
+        '(ASGI). Для настоящих цифр запустите gunicorn и uvicorn '
+        'и нагрузите их внешним инструментом, например wrk.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--clients', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--client-delay', type=float, default=0.05)
+
+    def run_wsgi(self, application, options):
+        """Синхронный воркер занят, пока клиент читает ответ."""
+        scope = _scope(options['path'])
+        delay = options['client_delay']
+        workers = threading.BoundedSemaphore(options['workers'])
+
+        def handle(submitted):
+            with workers:
+                result = application(
+                    build_environ(scope, b''), lambda status, headers: None)
+                try:
+                    b''.join(result)
+                finally:
+                    result.close()
+                time.sleep(delay)
+            return time.monotonic() - submitted
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['clients']) as clients:
+            futures = [
+                clients.submit(handle, time.monotonic())
+                for _ in range(options['requests'])
+            ]
+            latencies = [future.result() for future in futures]
+        return _summary('wsgi', latencies, time.monotonic() - started)
+
+    def run_asgi(self, application, options):
+        """Ответ медленному клиенту отправляется в цикле событий."""
+        delay = options['client_delay']
+
+        async def handle(asgi, semaphore, submitted):
+            async with semaphore:
+                messages = [{'type': 'http.request', 'body': b''}]
+
+                async def receive():
+                    return messages.pop()
+
+                async def send(message):
+                    if message['type'] == 'http.response.body':
+                        await asyncio.sleep(delay)
+
+                await asgi(_scope(options['path']), receive, send)
+                return time.monotonic() - submitted
+
+        async def run():
+            asgi = WsgiToAsgi(application, options['workers'])
+            semaphore = asyncio.Semaphore(options['clients'])
+            try:
+                return await asyncio.gather(*(
+                    handle(asgi, semaphore, time.monotonic())
+                    for _ in range(options['requests'])
+                ))
+            finally:
+                asgi.close()
+
+        started = time.monotonic()
+        latencies = asyncio.run(run())
+        return _summary('asgi', latencies, time.monotonic() - started)
+
+    def handle(self, *args, **options):
+        application = get_wsgi_application()
+        for result in (
+            self.run_wsgi(application, options),
+            self.run_asgi(application, options),
+        ):
+            self.stdout.write(
+                '{mode}: {requests} запросов, {rps:.1f} запр/с, '
+                'p50 {p50_ms:.1f} мс, p95 {p95_ms:.1f} мс'.format(**result))
@@ -0,0 +1,185 @@
+"""Метрики производительности запросов в формате Prometheus.
+
+MetricsMiddleware заводит на каждый запрос RequestStats и кладет его
+в контекст: запросы к базе считает execute_wrapper, время шаблонов —
+бэкенд core.templates, события кеша — core.cache.CacheMetrics. После
+ответа все это попадает в registry с меткой view_name и отдается
+представлением core.views.metrics. Значения хранятся в памяти
+процесса: при нескольких воркерах Prometheus опрашивает каждый.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Обработанные запросы.'),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время обработки запроса.'),
+    'yatube_db_queries_total': (
+        'counter', 'Запросы к базе данных.'),
+    'yatube_db_query_seconds_total': (
+        'counter', 'Время запросов к базе данных.'),
+    'yatube_template_render_seconds_total': (
+        'counter', 'Время отрисовки шаблонов.'),
+    'yatube_cache_events_total': (
+        'counter', 'События кеша: hit, miss, early, coalesced, stale.'),
+    'yatube_thumbnail_duration_seconds': (
+        'histogram', 'Время создания вариантов картинки поста.'),
+}
+
+_current = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """Счетчики одного запроса."""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache = Counter()
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def server_timing(self, duration):
+        """Значение заголовка Server-Timing."""
+        cache = ', '.join(
+            f'{name} {event} {count}'
+            for (name, event), count in sorted(self.cache.items()))
+        parts = [
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.db_queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+        ]
+        if cache:
+            parts.append(f'cache;desc="{cache}"')
+        parts.append(f'total;dur={duration * 1000:.1f}')
+        return ', '.join(parts)
+
+
+def current():
+    """RequestStats текущего запроса или None вне запроса."""
+    return _current.get()
+
+
+@contextmanager
+def collect(stats):
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed_template():
+    """Учитывает время отрисовки; вложенные шаблоны не считаются дважды."""
+    stats = current()
+    if stats is None:
+        yield
+        return
+    stats.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.template_depth -= 1
+        if not stats.template_depth:
+            stats.template_time += time.perf_counter() - started
+
+
+class Registry:
+    """Счетчики и гистограммы с метками."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            self._counters[name, tuple(labels)] += value
+
+    def observe(self, name, value, labels=()):
+        key = (name, tuple(labels))
+        with self._lock:
+            histogram = self._histograms.setdefault(
+                key, {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0})
+            for index, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram['buckets'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus."""
+        with self._lock:
+            samples = defaultdict(list)
+            for (name, labels), value in self._counters.items():
+                samples[name].append((name, labels, value))
+            for (name, labels), histogram in self._histograms.items():
+                for bound, count in zip(BUCKETS, histogram['buckets']):
+                    samples[name].append((
+                        f'{name}_bucket', labels + (('le', str(bound)),),
+                        count))
+                samples[name].append((
+                    f'{name}_bucket', labels + (('le', '+Inf'),),
+                    histogram['count']))
+                samples[name].append((f'{name}_sum', labels, histogram['sum']))
+                samples[name].append(
+                    (f'{name}_count', labels, histogram['count']))
+        lines = []
+        for name in sorted(samples):
+            kind, help_text = METRICS.get(name, ('untyped', ''))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for sample, labels, value in samples[name]:
+                lines.append(f'{sample}{_labels(labels)} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            key, str(value).replace('\\', r'\\').replace('"', r'\"'))
+        for key, value in labels)
+    return '{' + pairs + '}'
+
+
+registry = Registry()
+
+
+def record_request(view, method, status, duration, stats):
+    """Переносит счетчики запроса в registry."""
+    labels = (('view', view),)
+    registry.inc(
+        'yatube_requests_total',
+        labels + (('method', method), ('status', status)))
+    registry.observe('yatube_request_duration_seconds', duration, labels)
+    registry.inc('yatube_db_queries_total', labels, stats.db_queries)
+    registry.inc('yatube_db_query_seconds_total', labels, stats.db_time)
+    registry.inc(
+        'yatube_template_render_seconds_total', labels, stats.template_time)
+    for (name, event), count in stats.cache.items():
+        registry.inc(
+            'yatube_cache_events_total',
+            labels + (('cache', name), ('event', event)), count)
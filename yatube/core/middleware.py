@@ -0,0 +1,36 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import RequestStats, collect, record_request
+
+
+class MetricsMiddleware:
+    """Собирает метрики запроса (core.metrics).
+
+    Стоит первым в MIDDLEWARE, чтобы учитывать время всех остальных.
+    При SERVER_TIMING добавляет заголовок Server-Timing для DevTools.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        started = time.perf_counter()
+        with collect(stats), ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(stats.execute_wrapper))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        view = resolver_match.view_name if resolver_match else 'unmatched'
+        record_request(
+            view, request.method, response.status_code, duration, stats)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = stats.server_timing(duration)
+        return response
@@ -0,0 +1,147 @@
+"""Курсорная (keyset) пагинация.
+
+Страница выбирается условием по паре (pub_date, id) от последней
+записи предыдущей страницы, поэтому не нужны ни COUNT(*), ни OFFSET:
+любая страница стоит столько же, сколько первая.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+LAST = 'l'
+
+
+class CursorPage:
+    """Страница курсорного пагинатора.
+
+    Повторяет ту часть интерфейса django.core.paginator.Page,
+    которая нужна шаблонам: итерация, len, has_next и т.д.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def last_cursor(self):
+        return encode_cursor(LAST)
+
+
+def encode_cursor(direction, value=None, pk=None):
+    """Упаковывает позицию в непрозрачный токен для URL."""
+    raw = direction
+    if value is not None:
+        raw = f'{direction}|{value.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Распаковывает токен. Для битого токена возвращает None."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(
+            cursor + '=' * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if raw == LAST:
+        return LAST, None, None
+    parts = raw.split('|')
+    if len(parts) != 3 or parts[0] not in (NEXT, PREVIOUS):
+        return None
+    direction, value, pk = parts
+    try:
+        value = parse_datetime(value)
+        pk = int(pk)
+    except ValueError:
+        return None
+    if value is None:
+        return None
+    return direction, value, pk
+
+
+class KeysetPaginator:
+    """Пагинатор по ключу (key, id) в порядке убывания.
+
+    Использование совпадает с Paginator:
+    KeysetPaginator(queryset, 10).get_page(request.GET.get('cursor')).
+    """
+
+    def __init__(self, object_list, per_page, key='pub_date'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.key = key
+
+    def _cursor(self, direction, obj):
+        return encode_cursor(direction, getattr(obj, self.key), obj.pk)
+
+    def _fetch(self, queryset):
+        return list(queryset[:self.per_page + 1])
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу для токена или первую страницу."""
+        position = decode_cursor(cursor)
+        key = self.key
+        descending = self.object_list.order_by(f'-{key}', '-pk')
+        ascending = self.object_list.order_by(key, 'pk')
+
+        if position is None:
+            items = self._fetch(descending)
+            has_next = len(items) > self.per_page
+            has_previous = False
+            items = items[:self.per_page]
+        elif position[0] == NEXT:
+            _, value, pk = position
+            items = self._fetch(descending.filter(
+                Q(**{f'{key}__lt': value}) | Q(**{key: value, 'pk__lt': pk})
+            ))
+            has_next = len(items) > self.per_page
+            has_previous = True
+            items = items[:self.per_page]
+        else:
+            if position[0] == LAST:
+                queryset = ascending
+            else:
+                _, value, pk = position
+                queryset = ascending.filter(
+                    Q(**{f'{key}__gt': value})
+                    | Q(**{key: value, 'pk__gt': pk})
+                )
+            items = self._fetch(queryset)
+            has_previous = len(items) > self.per_page
+            has_next = position[0] == PREVIOUS
+            items = items[:self.per_page][::-1]
+
+        next_cursor = None
+        previous_cursor = None
+        if items and has_next:
+            next_cursor = self._cursor(NEXT, items[-1])
+        if items and has_previous:
+            previous_cursor = self._cursor(PREVIOUS, items[0])
+        return CursorPage(items, next_cursor, previous_cursor)
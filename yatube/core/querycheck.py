@@ -0,0 +1,185 @@
+"""Поиск N+1 и медленных запросов к базе.
+
+QueryReport через execute_wrapper записывает все запросы, сделанные
+за время обработки запроса, вместе со стеком кода проекта и шаблонов,
+из которых они пришли. Запросы группируются по нормализованному SQL
+(литералы заменены на ?), поэтому одинаковые запросы с разными id
+попадают в одну группу — признак N+1.
+
+QueryCheckMiddleware включается настройкой QUERY_CHECK и пишет
+найденные проблемы в лог yatube.queries. При QUERY_CHECK_STRICT,
+который ставит тестовый раннер core.test_runner, проблема становится
+ошибкой QueryCheckError, и тест, запросивший страницу, падает.
+Бюджет запросов представления объявляется декоратором query_budget.
+"""
+import logging
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger('yatube.queries')
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_RE = re.compile(r'\bIN \((?:\?, )*\?\)')
+SPACE_RE = re.compile(r'\s+')
+# В тестах Django подменяет Template._render на instrumented_test_render.
+TEMPLATE_RENDER_FUNCTIONS = ('_render', 'instrumented_test_render')
+
+
+class QueryCheckError(AssertionError):
+    pass
+
+
+def normalize(sql):
+    """SQL без литералов: запросы одной формы с разными id совпадают."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql.replace('%s', '?'))
+    sql = IN_RE.sub('IN (...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def _is_project_file(filename):
+    return (
+        filename.startswith(settings.BASE_DIR)
+        and 'site-packages' not in filename
+        and filename != __file__
+    )
+
+
+def caller_stack():
+    """Кадры проекта и шаблоны, из которых сделан запрос, снаружи внутрь."""
+    stack = []
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if _is_project_file(code.co_filename):
+            stack.append('{}:{} {}'.format(
+                os.path.relpath(code.co_filename, settings.BASE_DIR),
+                frame.f_lineno, code.co_name))
+        elif code.co_name in TEMPLATE_RENDER_FUNCTIONS:
+            template = frame.f_locals.get('self')
+            name = isinstance(template, Template) and (
+                template.origin.template_name)
+            if name:
+                stack.append(f'template {name}')
+        frame = frame.f_back
+    return stack[::-1]
+
+
+class QueryRecord:
+
+    def __init__(self, sql, duration, stack):
+        self.sql = sql
+        self.normalized = normalize(sql)
+        self.duration = duration
+        self.stack = stack
+
+
+class QueryReport:
+    """Запросы к базе, сделанные внутри with QueryReport()."""
+
+    def __init__(self):
+        self.queries = []
+        self._stack = ExitStack()
+
+    def __enter__(self):
+        for connection in connections.all():
+            self._stack.enter_context(
+                connection.execute_wrapper(self.execute_wrapper))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(QueryRecord(
+                sql, time.perf_counter() - started, caller_stack()))
+
+    def groups(self):
+        groups = defaultdict(list)
+        for query in self.queries:
+            groups[query.normalized].append(query)
+        return groups
+
+    def repeated(self, threshold):
+        """Группы из threshold и более одинаковых запросов."""
+        return [
+            queries for queries in self.groups().values()
+            if len(queries) >= threshold
+        ]
+
+    def slow(self, threshold_ms):
+        return [
+            query for query in self.queries
+            if query.duration * 1000 >= threshold_ms
+        ]
+
+    def problems(self, budget=None):
+        """Описания найденных проблем, пустой список — все в порядке."""
+        problems = []
+        if budget is not None and len(self.queries) > budget:
+            problems.append(
+                f'{len(self.queries)} запросов при бюджете {budget}')
+        for queries in self.repeated(settings.QUERY_CHECK_REPEAT):
+            problems.append(
+                f'N+1: {len(queries)} раз {queries[0].normalized}\n'
+                + _format_stack(queries[0].stack))
+        for query in self.slow(settings.QUERY_CHECK_SLOW_MS):
+            problems.append(
+                f'медленный запрос {query.duration * 1000:.1f} мс: '
+                f'{query.sql}\n' + _format_stack(query.stack))
+        return problems
+
+
+def _format_stack(stack):
+    return '\n'.join(f'    {line}' for line in stack)
+
+
+def query_budget(budget):
+    """Объявляет, сколько запросов к базе может сделать представление.
+
+    Ставится самым внешним декоратором, проверяется
+    QueryCheckMiddleware.
+    """
+    def decorator(view):
+        view.query_budget = budget
+        return view
+    return decorator
+
+
+class QueryCheckMiddleware:
+    """Проверяет запросы к базе каждого запроса при QUERY_CHECK."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_CHECK:
+            return self.get_response(request)
+        with QueryReport() as report:
+            response = self.get_response(request)
+        resolver_match = getattr(request, 'resolver_match', None)
+        budget = getattr(resolver_match.func, 'query_budget', None) if (
+            resolver_match) else None
+        problems = report.problems(budget)
+        if problems:
+            view = resolver_match.view_name if resolver_match else None
+            message = '{} {} ({}):\n{}'.format(
+                request.method, request.get_full_path(), view,
+                '\n'.join(problems))
+            if settings.QUERY_CHECK_STRICT:
+                raise QueryCheckError(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,94 @@
+"""Маршрутизация чтения на реплики базы данных.
+
+Представления, помеченные read_from_replica, читают из случайной
+реплики из settings.REPLICA_DATABASES. После изменения данных
+(pin_primary) браузер пользователя на REPLICA_STICKY_SECONDS
+привязывается к основной базе, чтобы он сразу видел свои правки,
+даже если реплика еще отстает. Привязка хранится в cookie, а не
+в сессии: страницы-оболочки (core.holes) не должны читать сессию.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+PRIMARY_UNTIL_COOKIE = 'primary_until'
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+class ReplicaRouter:
+    """Чтение внутри read_from_replica идет в реплику, запись — в default."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+def replica_for(request):
+    """Алиас реплики для запроса или None, если читать из default."""
+    replicas = settings.REPLICA_DATABASES
+    if not replicas:
+        return None
+    try:
+        pinned_until = float(request.COOKIES.get(PRIMARY_UNTIL_COOKIE, 0))
+    except ValueError:
+        pinned_until = 0
+    if pinned_until > time.time():
+        return None
+    return random.choice(replicas)
+
+
+def read_from_replica(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _read_alias.set(replica_for(request))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Чтение внутри блока идет в default, даже в read_from_replica.
+
+    Нужно там, где по прочитанному сразу пишут: отстающая реплика
+    дала бы записать дубли или пропустить строки.
+    """
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def pin_primary(view):
+    """Привязывает браузер к default после успешной записи.
+
+    Изменяющие представления после записи делают редирект,
+    поэтому привязка ставится только на ответ-редирект.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if settings.REPLICA_DATABASES and response.status_code in (301, 302):
+            response.set_cookie(
+                PRIMARY_UNTIL_COOKIE,
+                time.time() + settings.REPLICA_STICKY_SECONDS,
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True)
+        return response
+    return wrapper
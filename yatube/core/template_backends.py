@@ -0,0 +1,26 @@
+"""Шаблонный бэкенд Django с учетом времени отрисовки (core.metrics)."""
+from django.template.backends.django import DjangoTemplates
+
+from .metrics import timed_template
+
+
+class Template:
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with timed_template():
+            return self.template.render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+
+    def from_string(self, template_code):
+        return Template(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name))
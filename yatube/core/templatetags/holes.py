@@ -0,0 +1,21 @@
+from django import template
+from django.utils.html import format_html
+from django.utils.http import urlencode
+
+from core.holes import render_hole
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **params):
+    """Персональный фрагмент core.holes.
+
+    В оболочке (в контексте есть shell) выводит гостевой вариант
+    для последующей подстановки, иначе — вариант для пользователя.
+    """
+    if not context.get('shell'):
+        return render_hole(name, params, context.get('request'))
+    return format_html(
+        '<div data-hole="{}" data-params="{}">{}</div>',
+        name, urlencode(params), render_hole(name, params))
@@ -0,0 +1,48 @@
+"""Тестовое окружение проекта.
+
+manage.py test берет его из TEST_RUNNER, pytest — из conftest.py,
+который вызывает те же функции: иначе под pytest не было бы ни
+строгой проверки запросов, ни алиаса реплики.
+"""
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+# Реплика для тестов: зеркало default, то есть отдельное соединение
+# с той же тестовой базой.
+TEST_REPLICA = 'test_replica'
+
+
+def enable_strict_query_check():
+    """core.querycheck строго проверяет каждую запрошенную тестами
+    страницу: превышение query_budget, N+1 или медленный запрос
+    роняют тест."""
+    settings.QUERY_CHECK = True
+    settings.QUERY_CHECK_STRICT = True
+
+
+def add_test_replica():
+    """Алиас TEST_REPLICA для тестов маршрутизации чтения. Вызывается
+    до создания тестовых баз."""
+    connections.databases.setdefault(TEST_REPLICA, dict(
+        connections.databases['default'], TEST={'MIRROR': 'default'}))
+
+
+class QueryCheckRunner(DiscoverRunner):
+    """Раннер со строгой проверкой запросов."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        enable_strict_query_check()
+
+
+class ReplicaMirrorMixin:
+    """Добавляет к тестовым базам алиас TEST_REPLICA."""
+
+    def setup_databases(self, **kwargs):
+        add_test_replica()
+        return super().setup_databases(**kwargs)
+
+
+class YatubeRunner(ReplicaMirrorMixin, QueryCheckRunner):
+    """Раннер manage.py test (settings.TEST_RUNNER)."""
@@ -1,4 +1,18 @@
+import hmac
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, JsonResponse, QueryDict
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_GET
+from django.views.static import serve
+
+from .cache import metrics
+from .holes import accepts, render_hole
+from .metrics import registry
 
 
 def page_not_found(request, exception):
@@ -16,3 +30,60 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def cache_stats(request):
+    """Счетчики попаданий и промахов кеша текущего процесса."""
+    return JsonResponse(metrics.snapshot())
+
+
+def has_metrics_token(request):
+    """Передан ли заголовок Authorization: Bearer <METRICS_TOKEN>."""
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and hmac.compare_digest(
+        header.encode(), f'Bearer {token}'.encode())
+
+
+def prometheus_metrics(request):
+    """Метрики процесса в текстовом формате Prometheus.
+
+    Доступны сотрудникам и по токену METRICS_TOKEN. Адрес клиента
+    не проверяется: за обратным прокси на той же машине все
+    запросы приходят с 127.0.0.1.
+    """
+    if not (has_metrics_token(request) or request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def serve_immutable(request, path, document_root=None):
+    """Отдает медиафайлы с бессрочным кешированием.
+
+    Имена картинок постов и их превью зависят от содержимого,
+    поэтому файл по одному адресу никогда не меняется.
+    """
+    response = serve(request, path, document_root=document_root)
+    patch_cache_control(
+        response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    return response
+
+
+@require_GET
+@cache_control(private=True, no_cache=True)
+def holes(request):
+    """Персональные фрагменты страницы-оболочки одним ответом.
+
+    Параметры запроса: имя фрагмента -> его параметры в виде
+    urlencoded-строки, как в data-params. Неизвестные имена и фрагменты
+    с неподходящими параметрами пропускаются.
+    """
+    fragments = {}
+    for name, params in request.GET.items():
+        params = QueryDict(params).dict()
+        if accepts(name, params):
+            fragments[name] = render_hole(name, params, request)
+    return JsonResponse(fragments)
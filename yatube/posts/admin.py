@@ -1,6 +1,9 @@
 from django.contrib import admin
 
 from .models import Post, Group, Follow, Comment
+from .search import is_supported, search_ids
+
+ADMIN_SEARCH_LIMIT = 1000
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -18,6 +21,14 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск через полнотекстовый индекс вместо LIKE по text."""
+        if not search_term or not is_supported():
+            return super().get_search_results(
+                request, queryset, search_term)
+        return queryset.filter(
+            pk__in=search_ids(search_term, ADMIN_SEARCH_LIMIT)), False
+
 
 admin.site.register(Post, PostAdmin)
 
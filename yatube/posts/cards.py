@@ -0,0 +1,76 @@
+"""Кеш карточек постов includes/list_posts.html.
+
+Карточка кешируется по ключу из id поста и версий поста, его группы
+и автора. Версии хранятся в кеше и меняются сигналами при сохранении
+или удалении объектов, поэтому правки видны сразу, а старые карточки
+просто перестают запрашиваться и вытесняются по таймауту.
+"""
+from functools import partial
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core.cache import get_many_or_set
+
+CARD_TEMPLATE = 'includes/list_posts.html'
+CARD_SEPARATOR = '\n<hr>\n'
+
+
+def version_key(kind, pk):
+    return f'card-version:{kind}:{pk}'
+
+
+# Меняется при любом сохранении поста: входит в ключ кеша страниц.
+FEED_VERSION_KEY = version_key('feed', 'all')
+
+
+def bump_version(kind, pk):
+    """Делает недействительными все карточки, зависящие от объекта."""
+    cache.set(version_key(kind, pk), uuid4().hex, None)
+
+
+def _versions(posts):
+    keys = set()
+    for post in posts:
+        keys.add(version_key('post', post.pk))
+        keys.add(version_key('user', post.author_id))
+        if post.group_id:
+            keys.add(version_key('group', post.group_id))
+    versions = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys - versions.keys()}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def card_key(post, show_author, versions):
+    return 'card:{}:{}:{}:{}:{}'.format(
+        post.pk,
+        int(show_author),
+        versions[version_key('post', post.pk)],
+        versions[version_key('user', post.author_id)],
+        versions.get(version_key('group', post.group_id), ''),
+    )
+
+
+def render_cards(posts, show_author=True):
+    """HTML карточек постов; отрисовываются только промахи кеша.
+
+    Промахи идут через get_many_or_set: одну карточку после сброса
+    версии отрисовывает один процесс, а не все открывшие ленту.
+    """
+    posts = list(posts)
+    versions = _versions(posts)
+    keys = [card_key(post, show_author, versions) for post in posts]
+    cards = get_many_or_set(
+        {
+            key: partial(render_to_string, CARD_TEMPLATE, {
+                'post': post, 'show_author': show_author})
+            for post, key in zip(posts, keys)
+        },
+        settings.POST_CARD_CACHE_TIMEOUT,
+        name='card')
+    return CARD_SEPARATOR.join(cards[key] for key in keys)
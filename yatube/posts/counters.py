@@ -0,0 +1,61 @@
+"""Денормализованные счетчики постов, комментариев и подписок."""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+
+def bump(model, pk, field, delta):
+    """Атомарно меняет счетчик field у строки pk на delta."""
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def count_of(model, field):
+    """Подзапрос: число строк model, у которых field ссылается на pk."""
+    return Coalesce(
+        Subquery(
+            model.objects
+            .filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count')
+        ),
+        0
+    )
+
+
+STATS_SOURCES = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def reconcile():
+    """Пересчитывает все счетчики. Возвращает число исправленных строк."""
+    AuthorStats.objects.bulk_create(
+        [
+            AuthorStats(user_id=user_id)
+            for user_id in User.objects.filter(
+                stats__isnull=True).values_list('id', flat=True)
+        ],
+        ignore_conflicts=True)
+
+    fixed = 0
+    for field, (model, lookup) in STATS_SOURCES.items():
+        actual = count_of(model, lookup)
+        drifted = AuthorStats.objects.annotate(
+            actual=actual).exclude(**{field: F('actual')})
+        fixed += AuthorStats.objects.filter(
+            pk__in=drifted.values('pk')).update(**{field: actual})
+
+    actual = count_of(Comment, 'post')
+    drifted = Post.objects.annotate(
+        actual=actual).exclude(comments_count=F('actual'))
+    fixed += Post.objects.filter(
+        pk__in=drifted.values('pk')).update(comments_count=actual)
+    return fixed
@@ -0,0 +1,205 @@
+"""Генерация тестовых данных для бенчмарков и стендов.
+
+Строки создаются через bulk_create пачками по batch_size, каждая
+пачка в своей транзакции и без сигналов, поэтому счетчики,
+материализованные ленты и поисковый индекс достраиваются в конце
+одним проходом. Сами строки генерирует posts.fake, при workers > 1 —
+в нескольких процессах. Тексты и имена собираются из пулов,
+заполненных Faker: вызывать Faker на каждую из миллионов строк слишком
+долго. При одинаковом seed получается одинаковый набор данных.
+
+Популярность авторов подчиняется закону Ципфа с показателем skew: от
+нее зависят и число подписчиков, и число постов. Доля hot_share
+комментариев достается hot_posts самых новых постов.
+"""
+import math
+import multiprocessing
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.db import reset_queries, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from . import fake, feed, search
+from .cards import bump_version
+from .counters import reconcile
+from .models import Comment, Follow, Group, Post, User
+
+SCALES = {
+    'tiny': {
+        'users': 50, 'groups': 5, 'posts': 500,
+        'follows': 500, 'comments': 1000},
+    'small': {
+        'users': 1000, 'groups': 20, 'posts': 10000,
+        'follows': 20000, 'comments': 20000},
+    'medium': {
+        'users': 10000, 'groups': 100, 'posts': 100000,
+        'follows': 1000000, 'comments': 1000000},
+    'large': {
+        'users': 100000, 'groups': 1000, 'posts': 1000000,
+        'follows': 10000000, 'comments': 10000000},
+}
+
+PASSWORD = 'benchmark'
+# Размеры пулов текстов и имен, из которых собираются строки.
+SENTENCES = 1000
+NAMES = 500
+
+
+@contextmanager
+def explicit_dates(*models):
+    """Позволяет задать pub_date вручную, отключая auto_now_add."""
+    fields = [model._meta.get_field('pub_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _last_pk(model):
+    return model.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+def _new_ids(model, after):
+    return list(
+        model.objects.filter(pk__gt=after).order_by('pk')
+        .values_list('pk', flat=True))
+
+
+class Seeder:
+
+    def __init__(self, seed=0, days=365, batch_size=5000, skew=1.0,
+                 hot_posts=0.01, hot_share=0.5, workers=1, log=None):
+        faker = Faker('ru_RU')
+        faker.seed_instance(seed)
+        self.state = {
+            'seed': seed,
+            'now': timezone.now(),
+            'days': days,
+            'sentences': [faker.sentence() for _ in range(SENTENCES)],
+            'titles': [faker.catch_phrase()[:200] for _ in range(NAMES)],
+            'first_names': [faker.first_name() for _ in range(NAMES)],
+            'last_names': [faker.last_name() for _ in range(NAMES)],
+            'hot_share': hot_share,
+            'totals': {},
+        }
+        self.batch_size = batch_size
+        self.skew = skew
+        self.hot_posts = hot_posts
+        self.workers = workers
+        self.log = log or (lambda message: None)
+
+    def batches(self, kind, total, start=0):
+        """Пачки строк по порядку, при workers > 1 — из пула процессов.
+
+        start — смещение первой строки: пачки с другими смещениями
+        генерируются другими зернами.
+        """
+        end = start + total
+        tasks = [
+            (kind, offset, min(self.batch_size, end - offset))
+            for offset in range(start, end, self.batch_size)
+        ]
+        if self.workers <= 1:
+            fake.init(self.state)
+            yield from map(fake.rows, tasks)
+            return
+        with multiprocessing.Pool(
+                self.workers, initializer=fake.init,
+                initargs=(self.state,)) as pool:
+            yield from pool.imap(fake.rows, tasks)
+
+    def insert(self, model, kind, total, extra=None, start=0, **kwargs):
+        """Сохраняет total сгенерированных строк, возвращает их число."""
+        fields = fake.FIELDS[kind]
+        extra = extra or {}
+        self.state['totals'][kind] = total
+        done = 0
+        for rows in self.batches(kind, total, start):
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [model(**dict(zip(fields, row)), **extra)
+                     for row in rows],
+                    **kwargs)
+            # При DEBUG каждый INSERT на тысячи строк остался бы в памяти.
+            reset_queries()
+            done += len(rows)
+            self.log(f'{model.__name__}: {done}/{total}')
+        return done
+
+    def users(self, count):
+        last = _last_pk(User)
+        self.state['user_start'] = last + 1
+        self.insert(
+            User, 'users', count, extra={'password': make_password(PASSWORD)})
+        user_ids = _new_ids(User, last)
+        self.state['user_ids'] = user_ids
+        self.state['user_weights'] = fake.power_law(len(user_ids), self.skew)
+        return user_ids
+
+    def groups(self, count):
+        last = _last_pk(Group)
+        self.state['group_start'] = last + 1
+        self.insert(Group, 'groups', count)
+        self.state['group_ids'] = group_ids = _new_ids(Group, last)
+        return group_ids
+
+    def posts(self, count):
+        last = _last_pk(Post)
+        self.insert(Post, 'posts', count)
+        self.state['post_ids'] = post_ids = _new_ids(Post, last)
+        self.state['hot_posts'] = math.ceil(len(post_ids) * self.hot_posts)
+        return post_ids
+
+    def follows(self, count):
+        """Добавляет count подписок между новыми пользователями.
+
+        Повторы между пачками bulk_create пропускает, поэтому недостача
+        добирается новыми пачками. Если FOLLOW_ATTEMPTS пачек подряд
+        ничего не добавили, свободных пар, видимо, почти не осталось.
+        """
+        users = len(self.state['user_ids'])
+        count = min(count, users * (users - 1))
+        before = Follow.objects.count()
+        added = offset = stalled = 0
+        while added < count and stalled < fake.FOLLOW_ATTEMPTS:
+            missing = count - added
+            self.insert(
+                Follow, 'follows', missing, start=offset,
+                ignore_conflicts=True)
+            offset += missing
+            total = Follow.objects.count() - before
+            stalled = stalled + 1 if total == added else 0
+            added = total
+        return added
+
+    def comments(self, count):
+        return self.insert(Comment, 'comments', count)
+
+
+def generate(users, groups, posts, follows, comments, seed=0, days=365,
+             batch_size=5000, skew=1.0, hot_posts=0.01, hot_share=0.5,
+             workers=1, log=None):
+    """Добавляет в базу набор данных заданного размера."""
+    seeder = Seeder(
+        seed, days, batch_size, skew, hot_posts, hot_share, workers, log)
+    last_follow = _last_pk(Follow)
+    with explicit_dates(Post, Comment):
+        user_ids = seeder.users(users)
+        seeder.groups(groups)
+        post_ids = seeder.posts(posts) if user_ids else []
+        if len(user_ids) > 1:
+            seeder.follows(follows)
+        if post_ids:
+            seeder.comments(comments)
+    seeder.log('Счетчики, ленты и поисковый индекс')
+    with transaction.atomic():
+        reconcile()
+        feed.backfill_follows(last_follow)
+        search.rebuild(Post.objects.all())
+    bump_version('feed', 'all')
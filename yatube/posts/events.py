@@ -0,0 +1,111 @@
+"""Уведомления открытых лент о новых постах.
+
+При публикации пост отправляется через брокер core.broker в каналы
+общей ленты, своей группы и своего автора. Открытая лента
+подписывается на свои каналы через поток SSE (stream, только при
+EVENTS_STREAMING) или опрашивает сервер (wait), передавая id
+последнего известного поста, и показывает «N новых записей» вместо
+того, чтобы пользователь перезагружал страницу.
+"""
+import json
+import time
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count, Max
+from django.shortcuts import get_object_or_404
+
+from core.broker import get_broker
+from .models import Follow, Group, Post
+
+FEED_CHANNEL = 'posts:feed'
+
+
+def group_channel(group_id):
+    return f'posts:group:{group_id}'
+
+
+def author_channel(author_id):
+    return f'posts:author:{author_id}'
+
+
+def publish_post(post):
+    broker = get_broker()
+    message = {'post_id': post.pk}
+    channels = [FEED_CHANNEL, author_channel(post.author_id)]
+    if post.group_id:
+        channels.append(group_channel(post.group_id))
+    for channel in channels:
+        broker.publish(channel, message)
+
+
+def feed_for(request):
+    """Каналы ленты из параметров запроса и queryset ее постов.
+
+    group=<slug> — лента группы, follow — подписки пользователя,
+    без параметров — общая лента.
+    """
+    slug = request.GET.get('group')
+    if slug:
+        group = get_object_or_404(Group, slug=slug)
+        return (
+            [group_channel(group.id)], Post.objects.filter(group_id=group.id))
+    if 'follow' in request.GET:
+        if not request.user.is_authenticated:
+            raise PermissionDenied
+        authors = list(Follow.objects.filter(
+            user=request.user).values_list('author_id', flat=True))
+        return (
+            [author_channel(author_id) for author_id in authors],
+            Post.objects.filter(author_id__in=authors))
+    return [FEED_CHANNEL], Post.objects.all()
+
+
+def channels_for(request):
+    return feed_for(request)[0]
+
+
+def stream(channels):
+    """Поток SSE: событие posts на каждый новый пост каналов.
+
+    Пока событий нет, раз в EVENTS_HEARTBEAT секунд отправляется
+    комментарий, чтобы прокси не закрыли соединение. Через
+    EVENTS_STREAM_TIMEOUT секунд поток завершается, и браузер
+    переподключается, поэтому воркер не занят бесконечно.
+    Подписка создается при первом чтении потока: ответ, который
+    так и не начали отдавать, не оставит ее в брокере.
+    """
+    deadline = time.monotonic() + settings.EVENTS_STREAM_TIMEOUT
+    subscription = get_broker().subscribe(channels)
+    try:
+        yield f'retry: {settings.EVENTS_RETRY_MS}\n\n'
+        while time.monotonic() < deadline:
+            event = subscription.get(timeout=settings.EVENTS_HEARTBEAT)
+            if event is None:
+                yield ': ping\n\n'
+                continue
+            _, message = event
+            yield f'event: posts\ndata: {json.dumps(message)}\n\n'
+    finally:
+        subscription.close()
+
+
+def newer(posts, after):
+    """Число постов posts с id больше after и id последнего из них."""
+    return posts.filter(pk__gt=after).aggregate(
+        count=Count('pk'), last=Max('pk'))
+
+
+def wait(channels, posts, after, timeout):
+    """Long-poll: посты posts новее after, то есть вышедшие после
+    прошлого опроса. Если таких нет, ждет новый пост не дольше
+    timeout секунд. Считаются строки в базе, а брокер только будит
+    ожидание, поэтому посты между опросами не теряются."""
+    if timeout <= 0:
+        return newer(posts, after)
+    with get_broker().subscribe(channels) as subscription:
+        found = newer(posts, after)
+        if found['count']:
+            return found
+        subscription.get(timeout=timeout)
+    return newer(posts, after)
@@ -0,0 +1,148 @@
+"""Строки тестовых данных для posts.datagen.
+
+Модуль не импортирует Django, поэтому его функции можно выполнять
+в процессах multiprocessing при любом способе их запуска. Каждая пачка
+строк генерируется своим random.Random, зерно которого зависит только
+от seed, вида строк и смещения пачки: результат не зависит от числа
+процессов и порядка, в котором они закончат работу.
+"""
+import itertools
+import random
+from datetime import timedelta
+
+FIELDS = {
+    'users': ('username', 'first_name', 'last_name'),
+    'groups': ('title', 'slug', 'description'),
+    'posts': ('text', 'author_id', 'group_id', 'pub_date'),
+    'follows': ('user_id', 'author_id'),
+    'comments': ('text', 'author_id', 'post_id', 'pub_date'),
+}
+
+# Доля постов с группой.
+GROUP_SHARE = 0.7
+
+_state = {}
+
+
+def init(state):
+    """Данные, общие для всех пачек: пулы текстов, id, веса."""
+    _state.clear()
+    _state.update(state)
+
+
+def power_law(count, skew):
+    """Накопленные веса закона Ципфа: k-й элемент весит 1 / k ** skew.
+
+    skew=0 дает равномерное распределение.
+    """
+    return list(itertools.accumulate(
+        1 / rank ** skew for rank in range(1, count + 1)))
+
+
+def _text(rng, low, high):
+    return ' '.join(
+        rng.choices(_state['sentences'], k=rng.randint(low, high)))
+
+
+def _pub_dates(rng, kind, offset, size):
+    """Даты растут вместе с номером строки, как у настоящих постов,
+    поэтому индексы по pub_date пополняются с конца."""
+    total = _state['totals'][kind]
+    span = timedelta(days=_state['days'])
+    start = _state['now'] - span
+    return [
+        start + span * (position + rng.random()) / total
+        for position in range(offset, offset + size)
+    ]
+
+
+def _authors(rng, size):
+    """Авторы по популярности: первые user_ids пишут и читаются чаще."""
+    return rng.choices(
+        _state['user_ids'], cum_weights=_state['user_weights'], k=size)
+
+
+def _users(rng, offset, size):
+    start = _state['user_start'] + offset
+    return [
+        (f'user{number}',
+         rng.choice(_state['first_names']),
+         rng.choice(_state['last_names']))
+        for number in range(start, start + size)
+    ]
+
+
+def _groups(rng, offset, size):
+    start = _state['group_start'] + offset
+    return [
+        (rng.choice(_state['titles']), f'group{number}', _text(rng, 2, 4))
+        for number in range(start, start + size)
+    ]
+
+
+def _posts(rng, offset, size):
+    group_ids = _state['group_ids']
+    return [
+        (_text(rng, 1, 8),
+         author_id,
+         rng.choice(group_ids)
+         if group_ids and rng.random() < GROUP_SHARE else None,
+         pub_date)
+        for author_id, pub_date in zip(
+            _authors(rng, size), _pub_dates(rng, 'posts', offset, size))
+    ]
+
+
+# Во сколько раз больше пар можно перебрать, набирая пачку подписок
+# без повторов: у популярных авторов подписчики быстро кончаются.
+FOLLOW_ATTEMPTS = 10
+
+
+def _follows(rng, offset, size):
+    """Подписчик выбирается равномерно, автор — по популярности.
+
+    Пары в пачке не повторяются и не бывают подписками на себя.
+    """
+    user_ids = _state['user_ids']
+    pairs = {}
+    for _ in range(FOLLOW_ATTEMPTS):
+        missing = size - len(pairs)
+        if not missing:
+            break
+        for user_id, author_id in zip(
+                rng.choices(user_ids, k=missing), _authors(rng, missing)):
+            if user_id != author_id:
+                pairs.setdefault((user_id, author_id))
+    return list(pairs)[:size]
+
+
+def _comments(rng, offset, size):
+    """Доля hot_share комментариев приходится на hot_posts постов."""
+    user_ids = _state['user_ids']
+    post_ids = _state['post_ids']
+    hot = post_ids[-_state['hot_posts']:] if _state['hot_posts'] else ()
+    return [
+        (_text(rng, 1, 3),
+         rng.choice(user_ids),
+         rng.choice(hot)
+         if hot and rng.random() < _state['hot_share']
+         else rng.choice(post_ids),
+         pub_date)
+        for pub_date in _pub_dates(rng, 'comments', offset, size)
+    ]
+
+
+GENERATORS = {
+    'users': _users,
+    'groups': _groups,
+    'posts': _posts,
+    'follows': _follows,
+    'comments': _comments,
+}
+
+
+def rows(task):
+    """Пачка строк task = (вид, смещение, размер) в порядке FIELDS."""
+    kind, offset, size = task
+    rng = random.Random(f'{_state["seed"]}:{kind}:{offset}')
+    return GENERATORS[kind](rng, offset, size)
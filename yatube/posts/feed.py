@@ -0,0 +1,150 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост сразу раскладывается в FeedEntry всех подписчиков автора.
+Для авторов с очень большим числом подписчиков это дорого, поэтому их
+посты не раскладываются при публикации, а подтягиваются в ленту
+читателя при её открытии (fan-out on read).
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max, Prefetch, Q
+
+from core.routers import primary_reads
+from .models import AuthorStats, FeedEntry, Follow, Post
+
+
+def _entries(user_id, posts):
+    return [
+        FeedEntry(
+            user_id=user_id,
+            post_id=post.id,
+            author_id=post.author_id,
+            pub_date=post.pub_date)
+        for post in posts
+    ]
+
+
+def _save(entries):
+    FeedEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.FEED_BACKFILL_SIZE,
+        ignore_conflicts=True)
+
+
+def is_prolific(author_id):
+    """Посты автора не раскладываются по лентам при публикации."""
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def prolific_followed(user):
+    """id авторов из подписок user, которые читаются по запросу."""
+    return list(
+        Follow.objects
+        .filter(
+            user=user,
+            author__stats__followers_count__gt=settings.FEED_FANOUT_LIMIT)
+        .values_list('author_id', flat=True)
+    )
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_prolific(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    _save([
+        FeedEntry(
+            user_id=user_id,
+            post_id=post.id,
+            author_id=post.author_id,
+            pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    ])
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+    posts = Post.objects.filter(author_id=author_id).only(
+        'id', 'author_id', 'pub_date')[:settings.FEED_BACKFILL_SIZE]
+    _save(_entries(user_id, posts))
+
+
+def backfill_follows(after_follow=0):
+    """backfill для всех подписок с id больше after_follow одним
+    INSERT ... SELECT: после массовой загрузки подписок без сигналов.
+    Уже разложенные посты пропускаются."""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            connection.ops.insert_statement(ignore_conflicts=True)
+            + f' {quote(FeedEntry._meta.db_table)} '
+            '(user_id, post_id, author_id, pub_date) '
+            'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+            f'FROM {quote(Follow._meta.db_table)} f '
+            'JOIN (SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+            'PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+            f') AS position FROM {quote(Post._meta.db_table)}) p '
+            'ON p.author_id = f.author_id '
+            f'JOIN {quote(AuthorStats._meta.db_table)} s '
+            'ON s.user_id = f.author_id '
+            'WHERE f.id > %s AND p.position <= %s '
+            'AND s.followers_count <= %s '
+            'ORDER BY f.user_id'
+            + connection.ops.ignore_conflicts_suffix_sql(
+                ignore_conflicts=True),
+            [after_follow, settings.FEED_BACKFILL_SIZE,
+             settings.FEED_FANOUT_LIMIT])
+
+
+def prune(user_id, author_id):
+    """Убирает посты автора из ленты после отписки."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def pull(user):
+    """Дочитывает в ленту свежие посты авторов без fan-out.
+
+    Читает из default: по прочитанному сразу пишет. Одним запросом
+    находит последнюю разложенную дату каждого автора, вторым — все
+    посты новее неё, чтобы в ленте не было дыр, и пишет их одним
+    bulk_create. Авторов, которых в ленте еще нет (подписки загружены
+    без сигналов), заполняет backfill.
+    """
+    with primary_reads():
+        authors = prolific_followed(user)
+        if not authors:
+            return
+        newest = dict(
+            FeedEntry.objects
+            .filter(user=user, author_id__in=authors)
+            .order_by()
+            .values('author_id')
+            .annotate(newest=Max('pub_date'))
+            .values_list('author_id', 'newest')
+        )
+        for author_id in authors:
+            if author_id not in newest:
+                backfill(user.id, author_id)
+        if not newest:
+            return
+        condition = Q()
+        for author_id, date in newest.items():
+            condition |= Q(author_id=author_id, pub_date__gt=date)
+        posts = Post.objects.filter(condition).order_by().only(
+            'id', 'author_id', 'pub_date')
+        _save(_entries(user.id, posts.iterator(
+            chunk_size=settings.FEED_BACKFILL_SIZE)))
+
+
+def get_follow_feed(user):
+    """Лента подписок user в виде FeedEntry с подгруженными постами.
+
+    Сначала дочитывает в нее посты авторов без fan-out (pull).
+    """
+    pull(user)
+    return FeedEntry.objects.filter(user=user).prefetch_related(
+        Prefetch('post', queryset=Post.objects.for_feed().order_by()))
@@ -1,16 +1,27 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
 from .models import Post, Comment
+from .uploads import process_image
 
 
 class PostForm(forms.ModelForm):
-    """Форма создания нового поста и редактирования."""
+    """Форма создания нового поста и редактирования.
+
+    Загруженная картинка проверяется и нормализуется.
+    """
 
     class Meta:
         model = Post
 
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            image = process_image(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     """Форма создания нового комментария."""
@@ -0,0 +1,111 @@
+"""Функции состояния страниц для core.conditional.
+
+Каждая одним запросом находит самую свежую pub_date
+страницы и добавляет к ней версии из кеша карточек, которые
+меняются при правке постов, групп и авторов. Страницы сверяются
+только по ETag.
+"""
+from django.core.cache import cache
+from django.db.models import Max, OuterRef, Subquery
+from django.http import Http404
+
+from core.conditional import make_etag
+from .cards import FEED_VERSION_KEY, version_key
+from .models import Comment, Group, Post, User
+
+
+def newest(queryset):
+    return queryset.aggregate(newest=Max('pub_date'))['newest']
+
+
+def newest_of(queryset):
+    """Подзапрос со свежей pub_date для annotate, идет по индексу."""
+    return Subquery(
+        queryset.order_by('-pub_date').values('pub_date')[:1])
+
+
+def row(queryset):
+    """Единственная строка выборки без ORDER BY, который добавил бы first."""
+    rows = list(queryset[:1])
+    return rows[0] if rows else None
+
+
+def state(newest_date, *keys, extra=()):
+    """Пара (ETag, Last-Modified) по свежей дате и версиям из кеша.
+
+    Last-Modified не отдается: правки и комментарии меняют версии,
+    но не свежую дату, и If-Modified-Since получал бы 304 по
+    устаревшей странице.
+    """
+    if newest_date is None:
+        return None, None
+    versions = cache.get_many(keys)
+    return make_etag(
+        newest_date.isoformat(),
+        *extra,
+        *(versions.get(key) for key in keys),
+    ), None
+
+
+def index_state(request):
+    return state(newest(Post.objects.all()), FEED_VERSION_KEY)
+
+
+def group_state(request, slug):
+    group = row(Group.objects.filter(slug=slug).annotate(
+        newest=newest_of(Post.objects.filter(group_id=OuterRef('pk')))
+    ).values('id', 'newest'))
+    if group is None:
+        return None, None
+    return state(
+        group['newest'],
+        FEED_VERSION_KEY, version_key('group', group['id']))
+
+
+def profile_state(request, username):
+    author = row(User.objects.filter(username=username).annotate(
+        newest=newest_of(Post.objects.filter(author_id=OuterRef('pk')))
+    ).values(
+        'id', 'newest',
+        'stats__followers_count', 'stats__following_count',
+    ))
+    if author is None:
+        return None, None
+    return state(
+        author['newest'],
+        FEED_VERSION_KEY, version_key('user', author['id']),
+        extra=(
+            author['stats__followers_count'],
+            author['stats__following_count'],
+        ))
+
+
+def post_state(request, post_id):
+    """Нет поста — сразу 404: иначе представление, которому сам пост
+    не нужен (страница комментариев), ответило бы пустой страницей."""
+    post = row(Post.objects.filter(pk=post_id).annotate(
+        last_comment=newest_of(Comment.objects.filter(post_id=OuterRef('pk')))
+    ).order_by().values(
+        'pub_date', 'last_comment', 'author_id', 'comments_count',
+        'author__stats__posts_count',
+    ))
+    if post is None:
+        raise Http404('Пост не найден.')
+    return state(
+        max(filter(None, (post['pub_date'], post['last_comment']))),
+        version_key('post', post_id), version_key('user', post['author_id']),
+        extra=(post['comments_count'], post['author__stats__posts_count']))
+
+
+def follow_state(request):
+    """Состояние ленты подписок по свежим постам авторов из подписок.
+
+    Считается по постам, а не по FeedEntry, поэтому не пишет в базу:
+    посты авторов без fan-out дочитываются в ленту только при отдаче
+    страницы. Подписка на автора со старыми постами не меняет свежую
+    дату, поэтому в ETag входит версия подписок пользователя.
+    """
+    return state(
+        newest(Post.objects.filter(author__following__user=request.user)),
+        FEED_VERSION_KEY, version_key('follows', request.user.pk),
+        extra=(request.user.pk,))
@@ -0,0 +1,34 @@
+"""Персональные фрагменты страниц posts, см. core.holes."""
+from core.holes import register
+from .forms import CommentForm
+from .models import Follow
+
+
+@register('switcher', 'includes/switcher.html')
+def switcher(user, active):
+    if not user.is_authenticated:
+        return None
+    return {'active': active}
+
+
+@register('follow_button', 'includes/holes/follow_button.html')
+def follow_button(user, username):
+    if user.username == username:
+        return None
+    following = user.is_authenticated and Follow.objects.filter(
+        user=user, author__username=username).exists()
+    return {'username': username, 'following': following}
+
+
+@register('post_actions', 'includes/holes/post_actions.html')
+def post_actions(user, post_id, author):
+    if user.username != author:
+        return None
+    return {'post_id': post_id}
+
+
+@register('comment_form', 'includes/holes/comment_form.html')
+def comment_form(user, post_id):
+    if not user.is_authenticated:
+        return None
+    return {'post_id': post_id, 'form': CommentForm()}
@@ -0,0 +1,289 @@
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models import Max, Min
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core import benchmark
+from core.metrics import RequestStats
+from posts import datagen
+from posts.models import Comment, Follow, Group, Post, User
+
+SAMPLE_SIZE = 1000
+CLIENTS = 20
+WRITES = ('post_create', 'add_comment')
+
+
+class Scenario:
+    """Случайные объекты набора данных для запросов к представлениям."""
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.groups = self.sample(Group.objects.all(), 'slug')
+        self.group_ids = self.sample(Group.objects.all(), 'pk')
+        self.authors = self.sample(
+            User.objects.filter(stats__posts_count__gt=0), 'username')
+        self.posts = self.sample(Post.objects.all(), 'pk')
+        self.readers = list(User.objects.filter(pk__in=self.sample(
+            User.objects.filter(stats__following_count__gt=0), 'pk',
+            CLIENTS)))
+        self.workers = {}
+
+    def sample(self, queryset, field, size=SAMPLE_SIZE):
+        """До size случайных значений field без чтения всей таблицы."""
+        bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            return []
+        pks = range(bounds['low'], bounds['high'] + 1)
+        pks = self.random.sample(pks, min(len(pks), size * 2))
+        return list(
+            queryset.filter(pk__in=pks).order_by('pk')
+            .values_list(field, flat=True)[:size])
+
+    def worker(self, number):
+        """Клиенты и генератор случайных чисел потока number: Client
+        нельзя делить между потоками."""
+        if number not in self.workers:
+            clients = []
+            for reader in self.readers:
+                client = Client()
+                client.force_login(reader)
+                clients.append(client)
+            self.workers[number] = (
+                Client(), clients, random.Random(f'{self.seed}:{number}'))
+        return self.workers[number]
+
+    def requests(self, worker=0):
+        """Имя представления -> функция, возвращающая (client, method,
+        url, data) для очередного запроса потока worker."""
+        anonymous, clients, rng = self.worker(worker)
+        choice = rng.choice
+
+        def client():
+            return choice(clients)
+
+        return {
+            'index': lambda: (
+                anonymous, 'get', reverse('posts:index'), None),
+            'group_posts': lambda: (
+                anonymous, 'get',
+                reverse('posts:group_list', args=[choice(self.groups)]),
+                None),
+            'profile': lambda: (
+                anonymous, 'get',
+                reverse('posts:profile', args=[choice(self.authors)]),
+                None),
+            'post_detail': lambda: (
+                anonymous, 'get',
+                reverse('posts:post_detail', args=[choice(self.posts)]),
+                None),
+            'follow_index': lambda: (
+                client(), 'get', reverse('posts:follow_index'), None),
+            'post_create': lambda: (
+                client(), 'post', reverse('posts:post_create'),
+                {'text': 'Пост из бенчмарка',
+                 'group': choice(self.group_ids) if self.group_ids else ''}),
+            'add_comment': lambda: (
+                client(), 'post',
+                reverse('posts:add_comment', args=[choice(self.posts)]),
+                {'text': 'Комментарий из бенчмарка'}),
+        }
+
+
+@contextmanager
+def rolled_back():
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def measure(scenario, name, count, clear_cache, concurrency=1):
+    """Задержки count запросов к name из concurrency потоков и среднее
+    число запросов к базе.
+
+    У каждого потока свои клиенты и свое соединение с базой. Запись
+    откатывается после каждого запроса, поэтому работа из on_commit
+    (превью, уведомления, удаление картинок) не выполняется и в замер
+    не входит.
+    """
+    def run(make_request, share):
+        latencies = []
+        queries = errors = 0
+        for _ in range(share):
+            client, method, url, data = make_request()
+            if clear_cache:
+                cache.clear()
+            stats = RequestStats()
+            request_started = time.perf_counter()
+            try:
+                with ExitStack() as stack:
+                    if name in WRITES:
+                        stack.enter_context(rolled_back())
+                    for alias in connections:
+                        stack.enter_context(
+                            connections[alias].execute_wrapper(
+                                stats.execute_wrapper))
+                    response = getattr(client, method)(url, data or {})
+                    latencies.append(
+                        time.perf_counter() - request_started)
+            except DatabaseError:
+                # Тестовый клиент пробрасывает исключения представления;
+                # сервер ответил бы 500. Под нагрузкой это, например,
+                # блокировка SQLite при одновременной записи.
+                latencies.append(time.perf_counter() - request_started)
+                errors += 1
+            else:
+                errors += response.status_code >= 400
+            queries += stats.db_queries
+        return latencies, queries, errors
+
+    def run_in_thread(make_request, share):
+        # Настройка нового соединения (PRAGMA и т.п.) не относится
+        # к первому запросу потока.
+        connection.ensure_connection()
+        try:
+            return run(make_request, share)
+        finally:
+            connections.close_all()
+
+    makers = [scenario.requests(worker)[name] for worker in range(concurrency)]
+    shares = [
+        count // concurrency + (worker < count % concurrency)
+        for worker in range(concurrency)
+    ]
+    started = time.perf_counter()
+    if concurrency == 1:
+        results = [run(makers[0], count)]
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(run_in_thread, makers, shares))
+    summary = benchmark.summarize(
+        [latency for latencies, _, _ in results for latency in latencies],
+        time.perf_counter() - started)
+    summary['db_queries'] = (
+        sum(queries for _, queries, _ in results) / count if count else None)
+    summary['errors'] = sum(errors for _, _, errors in results)
+    summary['concurrency'] = concurrency
+    summary['rolled_back'] = name in WRITES
+    return summary
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет задержки и пропускную способность публичных '
+        'представлений на текущей базе и сохраняет результат в JSON. '
+        'С --scale сначала добавляет в базу набор данных, с --compare '
+        'сравнивает p95 с результатом другого прогона. Запросы идут '
+        'из --concurrency потоков; при одном потоке запр/с — просто '
+        'величина, обратная средней задержке, а не пропускная '
+        'способность сервера. Записи post_create и add_comment '
+        'откатываются, так что набор данных между прогонами не '
+        'меняется, но и работа из on_commit не выполняется: их '
+        'стоимость занижена.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=datagen.SCALES)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Потоки, отправляющие запросы одновременно.')
+        parser.add_argument(
+            '--views', nargs='+',
+            help='Представления для замера, по умолчанию все.')
+        parser.add_argument(
+            '--clear-cache', action='store_true',
+            help='Очищать кеш перед каждым запросом.')
+        parser.add_argument(
+            '--output',
+            help='Файл результата, по умолчанию '
+                 'benchmarks/<коммит>.json.')
+        parser.add_argument('--compare', help='JSON другого прогона.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост p95 при --compare, доля.')
+
+    def handle(self, *args, **options):
+        if options['scale']:
+            datagen.generate(
+                **datagen.SCALES[options['scale']],
+                seed=options['seed'],
+                log=lambda message: self.stderr.write(message))
+
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency должен быть положительным.')
+        scenario = Scenario(options['seed'])
+        if not (scenario.posts and scenario.readers):
+            raise CommandError(
+                'В базе нет постов или подписок, запустите с --scale.')
+        requests = scenario.requests()
+        names = options['views'] or list(requests)
+        unknown = set(names) - set(requests)
+        if unknown:
+            raise CommandError(
+                'Неизвестные представления: ' + ', '.join(sorted(unknown)))
+
+        concurrency = options['concurrency']
+        views = {}
+        for name in names:
+            measure(scenario, name, options['warmup'], False, concurrency)
+            views[name] = measure(
+                scenario, name, options['requests'],
+                options['clear_cache'], concurrency)
+            self.stdout.write(
+                '{name}: {rps:.1f} запр/с в {concurrency} потоках, '
+                'p50 {p50_ms:.1f} мс, p95 {p95_ms:.1f} мс, '
+                'p99 {p99_ms:.1f} мс, {db_queries:.1f} запросов к базе, '
+                'ошибок {errors}{note}'.format(
+                    name=name,
+                    note=' (откат: без on_commit)' if name in WRITES else '',
+                    **views[name]))
+
+        commit = benchmark.git_commit()
+        results = {
+            'commit': commit,
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'clear_cache': options['clear_cache'],
+            'concurrency': options['concurrency'],
+            'dataset': {
+                model.__name__: model.objects.count()
+                for model in (User, Group, Post, Follow, Comment)
+            },
+            'views': views,
+        }
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'benchmarks', f'{commit or "results"}.json')
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        benchmark.save(results, output)
+        self.stdout.write(f'Результат записан в {output}')
+
+        if options['compare']:
+            self.report(
+                benchmark.load(options['compare']), results,
+                options['threshold'])
+
+    def report(self, baseline, results, threshold):
+        rows, regressions = benchmark.compare(
+            baseline, results, threshold=threshold)
+        self.stdout.write(
+            f'p95 относительно {baseline.get("commit") or "базы"}:')
+        for view, before, after, change in rows:
+            self.stdout.write(
+                f'  {view}: {before:.1f} -> {after:.1f} мс ({change:+.0%})')
+        if regressions:
+            raise CommandError(
+                'p95 вырос больше чем на {:.0%}: {}'.format(
+                    threshold, ', '.join(regressions)))
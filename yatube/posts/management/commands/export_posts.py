@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии и подписки в NDJSON '
+        '(posts.transfer). Файл *.gz сжимается, "-" — вывод в stdout.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transfer.open_file(options['path'], 'w') as file:
+            count = transfer.export(file, options['chunk_size'])
+        if options['path'] != '-':
+            self.stdout.write(f'Выгружено строк: {count}')
@@ -0,0 +1,46 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает выгрузку export_posts пачками с upsert. С --resume '
+        'продолжает прерванную загрузку с места из файла <путь>.progress. '
+        'Если id поста или комментария в базе занят другим объектом '
+        '(другой автор или дата), загрузка останавливается; --replace '
+        'перезаписывает такие строки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--resume', action='store_true')
+        parser.add_argument('--replace', action='store_true')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        progress = transfer.progress_path(path)
+        skip = 0
+        if options['resume'] and path != '-' and os.path.exists(progress):
+            with open(progress) as file:
+                skip = int(file.read())
+            self.stdout.write(f'Продолжение после строки {skip}')
+
+        def checkpoint(done):
+            if path != '-':
+                with open(progress, 'w') as file:
+                    file.write(str(done))
+
+        importer = transfer.Importer(
+            options['batch_size'], options['replace'])
+        try:
+            with transfer.open_file(path, 'r') as file:
+                importer.load(file, skip, checkpoint)
+        except (OSError, transfer.TransferError) as error:
+            raise CommandError(error)
+        if os.path.exists(progress):
+            os.remove(progress)
+        self.stdout.write(f'Загружено строк: {importer.loaded}')
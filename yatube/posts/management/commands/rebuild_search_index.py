@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = search.rebuild(Post.objects.all())
+        self.stdout.write(f'Проиндексировано постов: {count}')
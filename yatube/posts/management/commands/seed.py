@@ -0,0 +1,80 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import datagen
+from posts.models import Comment, Follow, Group, Post, User
+
+COUNTS = ('users', 'groups', 'posts', 'follows', 'comments')
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу пользователями, группами, постами, подписками '
+        'и комментариями через bulk_create. Размер задается --scale '
+        'и/или числами строк каждого вида; одинаковый --seed дает '
+        'одинаковые данные при любом --workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', choices=datagen.SCALES, default='tiny')
+        for name in COUNTS:
+            parser.add_argument(
+                f'--{name}', type=int,
+                help='Число строк вместо значения из --scale.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней разбросать даты постов.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help='Показатель закона Ципфа для популярности авторов, '
+                 '0 — равномерно.')
+        parser.add_argument(
+            '--hot-posts', type=float, default=0.01,
+            help='Доля самых новых постов, собирающих комментарии.')
+        parser.add_argument(
+            '--hot-share', type=float, default=0.5,
+            help='Доля комментариев к горячим постам.')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Процессы, генерирующие строки.')
+
+    def handle(self, *args, **options):
+        counts = dict(datagen.SCALES[options['scale']])
+        for name in COUNTS:
+            if options[name] is not None:
+                counts[name] = options[name]
+        if min(counts.values()) < 0 or options['batch_size'] < 1:
+            raise CommandError('Размеры должны быть положительными.')
+        if not (0 <= options['hot_posts'] <= 1
+                and 0 <= options['hot_share'] <= 1):
+            raise CommandError('--hot-posts и --hot-share — доли от 0 до 1.')
+
+        models = (User, Group, Post, Follow, Comment)
+        before = {model: model.objects.count() for model in models}
+        started = time.monotonic()
+        datagen.generate(
+            **counts,
+            seed=options['seed'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            skew=options['skew'],
+            hot_posts=options['hot_posts'],
+            hot_share=options['hot_share'],
+            workers=options['workers'],
+            log=(
+                (lambda message: self.stderr.write(message))
+                if options['verbosity'] > 1 else None))
+        elapsed = time.monotonic() - started
+
+        added = {
+            model: model.objects.count() - before[model] for model in models
+        }
+        for model, count in added.items():
+            self.stdout.write(f'{model.__name__}: +{count}')
+        self.stdout.write(
+            f'{sum(added.values())} строк за {elapsed:.1f} с '
+            f'({sum(added.values()) / elapsed:.0f} строк/с)')
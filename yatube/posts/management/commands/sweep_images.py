@@ -0,0 +1,30 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.signals import release_image
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки постов, на которые не ссылается ни один пост '
+        'и которые не загружались заново дольше IMAGE_RELEASE_GRACE. '
+        'Запускается периодически, например из cron.'
+    )
+
+    def handle(self, *args, **options):
+        field = Post._meta.get_field('image')
+        names = field.storage.walk(field.upload_to.rstrip('/'))
+        deleted = 0
+        while True:
+            batch = list(islice(names, BATCH_SIZE))
+            if not batch:
+                break
+            used = set(Post.objects.filter(
+                image__in=batch).values_list('image', flat=True))
+            deleted += sum(
+                release_image(name) for name in batch if name not in used)
+        self.stdout.write(f'Удалено картинок: {deleted}')
@@ -0,0 +1,62 @@
+import re
+
+import snowballstemmer
+from django.db import migrations
+
+# Копия posts.search на момент миграции: дальнейшие правки модуля
+# не должны менять то, что делает уже примененная миграция.
+FTS_TABLE = 'posts_post_fts'
+CREATE_SQL = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+    "USING fts5(text, tokenize='unicode61 remove_diacritics 2')")
+DROP_SQL = f'DROP TABLE IF EXISTS {FTS_TABLE}'
+INSERT_SQL = f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)'
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-яё]')
+BATCH_SIZE = 1000
+
+
+def tokenize(text, stemmers):
+    words = []
+    for word in WORD_RE.findall(text):
+        word = word.lower().replace('ё', 'е')
+        language = 'russian' if CYRILLIC_RE.search(word) else 'english'
+        words.append(stemmers[language].stemWord(word))
+    return ' '.join(words)
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+    stemmers = {
+        language: snowballstemmer.stemmer(language)
+        for language in ('russian', 'english')
+    }
+    posts = apps.get_model('posts', 'Post').objects.values_list(
+        'id', 'text').iterator()
+    batch = []
+    with schema_editor.connection.cursor() as cursor:
+        for post_id, text in posts:
+            batch.append((post_id, tokenize(text, stemmers)))
+            if len(batch) == BATCH_SIZE:
+                cursor.executemany(INSERT_SQL, batch)
+                batch = []
+        if batch:
+            cursor.executemany(INSERT_SQL, batch)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_auto_20261018_0207'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
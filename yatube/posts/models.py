@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth import get_user_model
 
 from core.models import CreatedModel
+from .storage import ContentAddressedStorage
 from .validators import validate_not_empty
 
 
@@ -23,10 +24,35 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    """Выборки постов под конкретные страницы.
+
+    Собирает в одном месте select_related и набор колонок,
+    которые нужны шаблонам, чтобы страницы не делали запрос на пост.
+    """
+
+    def for_feed(self):
+        """Посты для карточек includes/list_posts.html."""
+        return self.select_related('author', 'group').only(
+            'text',
+            'pub_date',
+            'image',
+            'author__username',
+            'author__first_name',
+            'author__last_name',
+            'group__slug',
+        )
+
+    def for_detail(self):
+        """Пост для страницы post_detail."""
+        return self.select_related('author__stats', 'group')
+
+
 class Post(CreatedModel):
     """База данных постов.
 
-    Хранит поля: text, pub_date, author, group.
+    Хранит поля: text, pub_date, author, group, image
+    и счетчик комментариев comments_count.
     Связана с базой данных Group по полю group.
     """
 
@@ -55,19 +81,48 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
-        null=True
+        null=True,
+        db_index=True
     )
 
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                name='post_author_pub_date',
+                fields=['author', '-pub_date', '-id']),
+            models.Index(
+                name='post_group_pub_date',
+                fields=['group', '-pub_date', '-id']),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
+class CommentQuerySet(models.QuerySet):
+
+    def for_post(self, post_id):
+        """Комментарии поста с колонками, нужными шаблону."""
+        return self.filter(post_id=post_id).select_related('author').only(
+            'text',
+            'pub_date',
+            'author__username',
+        )
+
+
 class Comment(CreatedModel):
 
     post = models.ForeignKey(
@@ -84,8 +139,15 @@ class Comment(CreatedModel):
 
     text = models.TextField()
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                name='comment_post_pub_date',
+                fields=['post', '-pub_date', '-id']),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -110,6 +172,81 @@ class Follow(models.Model):
                 name='unique_following',
                 fields=['user', 'author'])
         ]
+        indexes = [
+            models.Index(
+                name='follow_author_user',
+                fields=['author', 'user']),
+        ]
 
     def __str__(self):
         return self.user.username
+
+
+class AuthorStats(models.Model):
+    """Счетчики пользователя.
+
+    Хранит число постов, подписчиков и подписок, чтобы страницы
+    не считали их запросом COUNT(*). Обновляются сигналами.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class FeedEntry(models.Model):
+    """Материализованная лента подписок.
+
+    Строка на каждую пару (подписчик, пост). Заполняется при публикации
+    поста и подписке, чистится при отписке, поэтому лента читается
+    одним проходом по индексу (user, pub_date).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_feed_entry',
+                fields=['user', 'post'])
+        ]
+        indexes = [
+            models.Index(
+                name='feed_user_pub_date',
+                fields=['user', '-pub_date', '-id']),
+            models.Index(
+                name='feed_user_author',
+                fields=['user', 'author']),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
@@ -0,0 +1,119 @@
+"""Полнотекстовый поиск по постам.
+
+Индекс хранится в виртуальной таблице SQLite FTS5 posts_post_fts,
+rowid строки совпадает с id поста. Встроенные токенайзеры FTS5 не
+умеют русскую морфологию, поэтому текст перед записью в индекс
+и запрос перед поиском приводятся к основам слов стеммером Snowball.
+Индекс обновляется сигналами при сохранении и удалении поста.
+На других СУБД поиск работает через icontains.
+"""
+import re
+import threading
+from functools import lru_cache
+from itertools import islice
+
+import snowballstemmer
+from django.conf import settings
+from django.db import connection
+
+FTS_TABLE = 'posts_post_fts'
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-яё]')
+# Словарь текстов намного меньше числа слов в них, а стеммер медленный.
+STEM_CACHE_SIZE = 100000
+REBUILD_BATCH_SIZE = 1000
+
+# Стеммер хранит состояние разбора слова и не потокобезопасен,
+# поэтому у каждого потока он свой.
+_local = threading.local()
+
+
+def _stemmer(language):
+    stemmers = getattr(_local, 'stemmers', None)
+    if stemmers is None:
+        stemmers = _local.stemmers = {}
+    if language not in stemmers:
+        stemmers[language] = snowballstemmer.stemmer(language)
+    return stemmers[language]
+
+
+def is_supported(using=None):
+    return (using or connection).vendor == 'sqlite'
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    language = 'russian' if CYRILLIC_RE.search(word) else 'english'
+    return _stemmer(language).stemWord(word)
+
+
+def tokenize(text):
+    """Основы слов текста."""
+    return [stem(word) for word in WORD_RE.findall(text)]
+
+
+def index_post(post):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, text) '
+            'VALUES (%s, %s)',
+            [post.pk, ' '.join(tokenize(post.text))])
+
+
+def unindex_post(post_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild(posts):
+    """Переиндексирует все посты из queryset posts."""
+    if not is_supported():
+        return 0
+    count = 0
+    rows = (
+        (post_id, ' '.join(tokenize(text)))
+        for post_id, text in posts.values_list('id', 'text').iterator())
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        while True:
+            batch = list(islice(rows, REBUILD_BATCH_SIZE))
+            if not batch:
+                break
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                batch)
+            count += len(batch)
+    return count
+
+
+def search_ids(query, limit=None):
+    """id постов, подходящих под запрос, от более релевантных."""
+    terms = tokenize(query)
+    if not terms or not is_supported():
+        return []
+    match = ' '.join(f'"{term}"*' for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}) LIMIT %s',
+            [match, limit or settings.SEARCH_RESULTS_LIMIT])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search(queryset, query, limit=None):
+    """Посты queryset, найденные по запросу, в порядке релевантности."""
+    if not query.strip():
+        return []
+    if not is_supported():
+        return list(queryset.filter(text__icontains=query)[
+            :limit or settings.SEARCH_RESULTS_LIMIT])
+    ids = search_ids(query, limit)
+    posts = queryset.in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
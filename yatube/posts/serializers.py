@@ -0,0 +1,33 @@
+"""Представление моделей posts в виде словарей для JSON-ответов.
+
+Поля подобраны под выборки for_feed и for_post, поэтому
+сериализация не делает дополнительных запросов.
+"""
+
+
+def group_data(group):
+    return {
+        'id': group.id,
+        'slug': group.slug,
+        'title': group.title,
+    }
+
+
+def post_data(post):
+    return {
+        'id': post.id,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+    }
+
+
+def comment_data(comment):
+    return {
+        'id': comment.id,
+        'author': comment.author.username,
+        'text': comment.text,
+        'pub_date': comment.pub_date,
+    }
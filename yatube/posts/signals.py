@@ -0,0 +1,132 @@
+"""Обработчики сигналов моделей приложения posts."""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from sorl.thumbnail import delete as delete_image
+from sorl.thumbnail.images import ImageFile
+
+from . import events, feed, search
+from .cards import bump_version
+from .counters import bump
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, **kwargs):
+    """У каждого пользователя есть строка счетчиков."""
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    """Новый пост попадает в ленты подписчиков и в счетчик автора,
+    а открытые ленты получают уведомление."""
+    if created:
+        bump(AuthorStats, instance.author_id, 'posts_count', 1)
+        feed.fan_out(instance)
+        transaction.on_commit(lambda: events.publish_post(instance))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    bump(AuthorStats, instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        bump(Post, instance.post_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    bump(Post, instance.post_id, 'comments_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    """После подписки в ленту добавляются последние посты автора."""
+    if created:
+        bump(AuthorStats, instance.author_id, 'followers_count', 1)
+        bump(AuthorStats, instance.user_id, 'following_count', 1)
+        feed.backfill(instance.user_id, instance.author_id)
+        bump_version('follows', instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """После отписки посты автора убираются из ленты."""
+    bump(AuthorStats, instance.author_id, 'followers_count', -1)
+    bump(AuthorStats, instance.user_id, 'following_count', -1)
+    feed.prune(instance.user_id, instance.author_id)
+    bump_version('follows', instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_card(sender, instance, **kwargs):
+    bump_version('post', instance.pk)
+    bump_version('feed', 'all')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_cards(sender, instance, **kwargs):
+    bump_version('group', instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cards(sender, instance, update_fields=None, **kwargs):
+    """Вход пользователя меняет только last_login, карточки не трогаем."""
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    bump_version('user', instance.pk)
+
+
+def release_image(name):
+    """Удаляет картинку и её превью, если на неё не ссылаются посты
+    и её давно не загружали заново (см. posts.storage)."""
+    if not name:
+        return False
+    storage = Post._meta.get_field('image').storage
+    return storage.delete_unused(
+        name,
+        lambda: Post.objects.filter(image=name).exists(),
+        lambda name: delete_image(ImageFile(name, storage)))
+
+
+@receiver(pre_save, sender=Post)
+def remember_image(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None:
+        return
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    instance._previous_image = Post.objects.filter(
+        pk=instance.pk).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_image', None)
+    if previous and previous != instance.image.name:
+        transaction.on_commit(lambda: release_image(previous))
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: release_image(name))
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
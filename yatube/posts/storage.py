@@ -0,0 +1,71 @@
+"""Хранилище картинок постов с адресацией по содержимому.
+
+Файл сохраняется под именем из sha256 его содержимого, поэтому
+одинаковые загрузки занимают на диске одно место и получают один
+набор превью sorl-thumbnail. Файл удаляется, когда на него больше
+не ссылается ни один пост (см. posts.signals).
+
+Загрузка уже существующего файла обновляет его mtime, а удаляется
+только файл старше IMAGE_RELEASE_GRACE: пост, сохранивший имя файла,
+но еще не закоммиченный, не останется без картинки. Проверка и
+удаление идут под той же блокировкой, что и обновление mtime. Файлы,
+освобожденные раньше срока, удаляет команда sweep_images. Содержимое файла
+по такому имени никогда не меняется, и его можно отдавать
+с бессрочными заголовками кеширования.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from core.cache import lock
+
+from .uploads import content_hash
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def hashed_name(self, name, content):
+        directory, filename = os.path.split(name)
+        digest = content_hash(content)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(
+            directory, digest[:2], digest[2:4], f'{digest}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = self.hashed_name(name, content)
+        with lock(f'image:{name}'):
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                content.seek(0)
+                name = self._save(name, content)
+        return name.replace('\\', '/')
+
+    def walk(self, directory):
+        """Имена всех файлов в directory и его подкаталогах."""
+        if not self.exists(directory):
+            return
+        directories, files = self.listdir(directory)
+        for filename in files:
+            yield f'{directory}/{filename}'
+        for child in directories:
+            yield from self.walk(f'{directory}/{child}')
+
+    def delete_unused(self, name, is_used, delete):
+        """Вызывает delete(name), если файл старше IMAGE_RELEASE_GRACE
+        и is_used() ложно. Возвращает True, если файл удален."""
+        with lock(f'image:{name}'):
+            try:
+                age = time.time() - os.path.getmtime(self.path(name))
+            except FileNotFoundError:
+                return False
+            if age < settings.IMAGE_RELEASE_GRACE or is_used():
+                return False
+            delete(name)
+            return True
@@ -0,0 +1,12 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, show_author=True):
+    """Карточки постов из кеша posts.cards."""
+    return mark_safe(render_cards(posts, show_author))
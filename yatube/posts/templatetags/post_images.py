@@ -0,0 +1,43 @@
+from django import template
+from django.conf import settings
+
+from posts.thumbnails import (
+    MIME_TYPES, cached_variants, image_formats, schedule)
+
+register = template.Library()
+
+CARD_SIZES = '(max-width: 992px) 100vw, 960px'
+
+
+@register.inclusion_tag('includes/post_picture.html')
+def post_picture(post, sizes=CARD_SIZES):
+    """Картинка поста с вариантами для srcset.
+
+    Пока варианты не готовы, выводится заглушка, а их генерация
+    ставится в фоновую очередь.
+    """
+    variants = cached_variants(post.image)
+    if variants is None:
+        if post.image:
+            schedule(post)
+        return {'has_image': bool(post.image)}
+
+    widths = sorted(settings.POST_IMAGE_WIDTHS)
+
+    def srcset(image_format):
+        return ', '.join(
+            f'{variants[image_format, width].url} {width}w'
+            for width in widths
+        )
+
+    *preferred, fallback = image_formats()
+    return {
+        'has_image': True,
+        'sizes': sizes,
+        'sources': [
+            (MIME_TYPES[image_format], srcset(image_format))
+            for image_format in preferred
+        ],
+        'srcset': srcset(fallback),
+        'src': variants[fallback, widths[-1]].url,
+    }
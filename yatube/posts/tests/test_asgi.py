@@ -0,0 +1,99 @@
+import asyncio
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.test import SimpleTestCase, override_settings
+
+from core.asgi import WsgiToAsgi, build_environ
+
+
+class AsgiTest(SimpleTestCase):
+    def request(self, path, query_string=b'', disconnect_after=None):
+        """Сообщения, которые приложение отправило клиенту.
+
+        После тела запроса receive ждет, а через disconnect_after
+        секунд сообщает об отключении клиента.
+        """
+        application = WsgiToAsgi(
+            get_wsgi_application(), threads=2, stream_threads=2)
+        messages = [{'type': 'http.request', 'body': b''}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            if disconnect_after is None:
+                await asyncio.Event().wait()
+            await asyncio.sleep(disconnect_after)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': query_string,
+            'headers': [(b'host', b'localhost'), (b'accept', b'text/html')],
+        }
+        asyncio.run(application(scope, receive, send))
+        application.close()
+        return sent
+
+    def test_page(self):
+        start, body = self.request('/about/author/')
+
+        self.assertEqual(start['status'], 200)
+        self.assertIn(
+            (b'content-type', b'text/html; charset=utf-8'), start['headers'])
+        self.assertIn('Об авторе'.encode(), body['body'])
+
+    def test_repeated_headers(self):
+        """Повторные заголовки склеиваются, куки — через точку с запятой."""
+        environ = build_environ({
+            'method': 'GET',
+            'path': '/',
+            'headers': [
+                (b'cookie', b'sessionid=1'), (b'cookie', b'csrftoken=2'),
+                (b'accept', b'text/html'), (b'accept', b'*/*'),
+            ],
+        }, b'')
+
+        self.assertEqual(environ['HTTP_COOKIE'], 'sessionid=1; csrftoken=2')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+
+    @override_settings(
+        EVENTS_STREAMING=True, EVENTS_STREAM_TIMEOUT=0.1,
+        EVENTS_HEARTBEAT=0.05)
+    def test_streaming_response(self):
+        """Поток SSE отдается по кускам до своего завершения."""
+        sent = self.request('/events/')
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertTrue(sent[1]['body'].startswith(b'retry:'))
+        self.assertTrue(sent[1]['more_body'])
+        self.assertIn(b': ping\n\n', [message['body'] for message in sent[1:]])
+        self.assertEqual(sent[-1], {'type': 'http.response.body', 'body': b''})
+
+    @override_settings(
+        EVENTS_STREAMING=True, EVENTS_STREAM_TIMEOUT=30,
+        EVENTS_HEARTBEAT=0.05)
+    def test_stream_stops_on_disconnect(self):
+        """Отключение клиента закрывает поток, не дожидаясь его конца."""
+        started = time.monotonic()
+        sent = self.request('/events/', disconnect_after=0.2)
+
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertTrue(sent[-1]['more_body'])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            'bench_servers', path='/about/author/', requests=4, clients=2,
+            workers=2, client_delay=0, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split(':')[0] for line in lines],
+                         ['wsgi', 'asgi'])
@@ -0,0 +1,99 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase
+
+from core import benchmark
+from posts import datagen
+from posts.counters import reconcile
+from posts.models import Comment, FeedEntry, Follow, Post, User
+from posts.search import search_ids
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        datagen.generate(
+            users=20, groups=3, posts=60, follows=40, comments=30,
+            batch_size=25)
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, 'results.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_generated_dataset_is_consistent(self):
+        """Счетчики, ленты и поиск достроены после bulk_create."""
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 30)
+        self.assertEqual(reconcile(), 0)
+        expected = sum(
+            min(Post.objects.filter(author_id=author_id).count(),
+                settings.FEED_BACKFILL_SIZE)
+            for author_id in Follow.objects.values_list(
+                'author_id', flat=True))
+        self.assertEqual(FeedEntry.objects.count(), expected)
+        word = Post.objects.first().text.split()[0]
+        self.assertTrue(search_ids(word))
+
+    def test_bench_views_writes_results(self):
+        """Все представления замерены без ошибок, записи откатились."""
+        posts = Post.objects.count()
+        call_command(
+            'bench_views', requests=3, warmup=1, output=self.output,
+            stdout=StringIO())
+        results = benchmark.load(self.output)
+        self.assertEqual(results['dataset']['Post'], posts)
+        self.assertEqual(set(results['views']), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'post_create', 'add_comment'})
+        for view, summary in results['views'].items():
+            with self.subTest(view=view):
+                self.assertEqual(summary['errors'], 0)
+                self.assertEqual(summary['requests'], 3)
+                self.assertLessEqual(summary['p50_ms'], summary['p99_ms'])
+                self.assertEqual(
+                    summary['rolled_back'],
+                    view in ('post_create', 'add_comment'))
+        self.assertEqual(Post.objects.count(), posts)
+
+    def test_compare_fails_on_regression(self):
+        """--compare падает, если p95 вырос больше порога."""
+        baseline = {'commit': 'base', 'views': {
+            'index': {'p95_ms': 0.001}}}
+        baseline_path = os.path.join(self.directory.name, 'base.json')
+        benchmark.save(baseline, baseline_path)
+        with self.assertRaisesMessage(CommandError, 'index'):
+            call_command(
+                'bench_views', views=['index'], requests=2, warmup=0,
+                output=self.output, compare=baseline_path,
+                stdout=StringIO())
+
+
+class ConcurrentBenchmarkTest(TransactionTestCase):
+    """Потоки открывают свои соединения и должны видеть данные,
+    поэтому без транзакции TestCase."""
+
+    def test_bench_views_concurrency(self):
+        datagen.generate(
+            users=20, groups=3, posts=60, follows=40, comments=30,
+            batch_size=25)
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command(
+                'bench_views', views=['index', 'profile'], requests=7,
+                warmup=0, concurrency=3, output=output, stdout=StringIO())
+            results = benchmark.load(output)
+        self.assertEqual(results['concurrency'], 3)
+        for view, summary in results['views'].items():
+            with self.subTest(view=view):
+                self.assertEqual(summary['requests'], 7)
+                self.assertEqual(summary['errors'], 0)
+                self.assertEqual(summary['concurrency'], 3)
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core.cache import get_many_or_set, get_or_set, metrics
+from posts.models import Post, User
+
+
+class CacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_anonymous_index_cached_until_new_post(self):
+        """Главная для гостя берется из кеша до появления нового поста."""
+        post = Post.objects.create(text='Первый', author=CacheTest.user)
+        self.client.get(reverse('posts:index'))
+        Post.objects.filter(pk=post.pk).update(text='Без сигнала')
+
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Первый')
+        self.assertEqual(metrics.snapshot()['page']['hit'], 1)
+
+        Post.objects.create(text='Второй', author=CacheTest.user)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Второй')
+
+    def test_get_or_set_waits_for_lock_holder(self):
+        """При занятой блокировке значение не вычисляется повторно."""
+        cache.add('lock:key', 1)
+        timer = threading.Timer(
+            0.1, cache.set, ('key', ('готово', 0, time.time() + 60)))
+        timer.start()
+
+        value = get_or_set('key', lambda: 'пересчитано', 60)
+        timer.join()
+
+        self.assertEqual(value, 'готово')
+        self.assertEqual(metrics.snapshot()['default']['coalesced'], 1)
+
+    def test_get_many_or_set_coalesces_misses(self):
+        """Промах, который уже вычисляет другой процесс, ждет его."""
+        cache.set('hit', ('из кеша', 0, time.time() + 60))
+        cache.add('lock:busy', 1)
+        timer = threading.Timer(
+            0.1, cache.set, ('busy', ('готово', 0, time.time() + 60)))
+        timer.start()
+
+        values = get_many_or_set({
+            'hit': lambda: 'пересчитано',
+            'busy': lambda: 'пересчитано',
+            'miss': lambda: 'вычислено',
+        }, 60, name='card')
+        timer.join()
+
+        self.assertEqual(
+            values, {'hit': 'из кеша', 'busy': 'готово', 'miss': 'вычислено'})
+        self.assertEqual(
+            metrics.snapshot()['card'],
+            {'hit': 1, 'miss': 2, 'early': 0, 'coalesced': 1, 'stale': 0})
@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.utils import QueryBudgetMixin
+
+
+class ConditionalTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(ConditionalTest.reader)
+
+    def pages(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': ConditionalTest.post.id}),
+        ]
+
+    def test_shell_pages_not_modified(self):
+        """Оболочка одна для всех и отдает 304 без отрисовки."""
+        for url in self.pages():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    response['Cache-Control'],
+                    'public, max-age=0, s-maxage=20')
+                self.assertFalse(response.has_header('Vary'))
+                with self.assertQueryBudget(1):
+                    not_modified = self.reader_client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_user_pages_are_private(self):
+        """У ленты подписок свой ETag и нет Last-Modified."""
+        url = reverse('posts:follow_index')
+        response = self.reader_client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertEqual(
+            self.reader_client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            ).status_code,
+            304)
+
+    def test_follow_page_etag_changes_with_follows(self):
+        """После подписки и отписки старый ETag ленты не дает 304."""
+        other = User.objects.create_user(username='other')
+        Post.objects.filter(pk=Post.objects.create(
+            text='Старый пост', author=other).pk).update(
+                pub_date=timezone.now() - timedelta(days=365))
+        url = reverse('posts:follow_index')
+        for change in (
+            lambda: Follow.objects.create(
+                user=ConditionalTest.reader, author=other),
+            lambda: Follow.objects.filter(
+                user=ConditionalTest.reader, author=other).delete(),
+        ):
+            etag = self.reader_client.get(url)['ETag']
+            change()
+            response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+
+    def test_changes_reset_etag(self):
+        """Новый комментарий или правка поста меняют ETag."""
+        url = reverse(
+            'posts:post_detail', kwargs={'post_id': ConditionalTest.post.id})
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(
+            post=ConditionalTest.post,
+            author=ConditionalTest.reader,
+            text='Коммент')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = self.client.get(reverse('posts:index'))['ETag']
+        ConditionalTest.post.text = 'Исправлено'
+        ConditionalTest.post.save()
+        response = self.client.get(
+            reverse('posts:index'), HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Исправлено')
@@ -0,0 +1,14 @@
+from django.db import connection
+from django.test import TestCase
+
+
+class SQLitePragmasTest(TestCase):
+    def test_pragmas_applied_on_connect(self):
+        """Соединение SQLite настраивается прагмами из settings."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            synchronous = cursor.fetchone()[0]
+            cursor.execute('PRAGMA temp_store')
+            temp_store = cursor.fetchone()[0]
+        self.assertEqual(synchronous, 1)
+        self.assertEqual(temp_store, 2)
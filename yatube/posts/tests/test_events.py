@@ -0,0 +1,152 @@
+import json
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.broker import CacheBroker, LocalBroker, get_broker
+from posts import events
+from posts.models import Follow, Group, Post, User
+
+
+class BrokerTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_brokers_deliver_to_subscribed_channels(self):
+        for broker in (LocalBroker(), CacheBroker()):
+            with self.subTest(broker=type(broker).__name__):
+                with broker.subscribe(['a', 'b']) as subscription:
+                    broker.publish('c', 'мимо')
+                    broker.publish('b', 'привет')
+                    self.assertEqual(
+                        subscription.get(timeout=1), ('b', 'привет'))
+                    self.assertIsNone(subscription.get(timeout=0))
+
+    def test_local_broker_forgets_closed_subscriptions(self):
+        broker = LocalBroker()
+        broker.subscribe(['a']).close()
+        self.assertEqual(dict(broker._subscriptions), {})
+
+
+@override_settings(EVENTS_HEARTBEAT=0.05, EVENTS_STREAMING=True)
+class EventsViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_stream_pushes_new_posts(self):
+        """Поток SSE присылает событие о новом посте ленты."""
+        self.client.force_login(EventsViewTest.reader)
+        queries = ['', 'group=group', 'follow']
+        for query in queries:
+            with self.subTest(query=query):
+                response = self.client.get(
+                    reverse('posts:post_events') + '?' + query)
+                chunks = iter(response.streaming_content)
+                self.assertTrue(next(chunks).startswith(b'retry:'))
+                events.publish_post(EventsViewTest.post)
+
+                self.assertEqual(
+                    response['Content-Type'], 'text/event-stream')
+                self.assertEqual(
+                    next(chunks),
+                    'event: posts\ndata: {}\n\n'.format(
+                        json.dumps({'post_id': EventsViewTest.post.id})
+                    ).encode())
+                self.assertEqual(next(chunks), b': ping\n\n')
+                response.close()
+
+    def test_unread_stream_does_not_subscribe(self):
+        """Подписка появляется только при чтении потока."""
+        broker = LocalBroker()
+        with mock.patch.object(events, 'get_broker', return_value=broker):
+            response = self.client.get(reverse('posts:post_events'))
+            self.assertEqual(dict(broker._subscriptions), {})
+            chunks = iter(response.streaming_content)
+            next(chunks)
+            self.assertIn(events.FEED_CHANNEL, broker._subscriptions)
+            response.close()
+        self.assertEqual(dict(broker._subscriptions), {})
+
+    @override_settings(EVENTS_STREAMING=False)
+    def test_stream_disabled_by_default(self):
+        """Без EVENTS_STREAMING потока нет, страницы опрашивают сервер."""
+        self.assertEqual(
+            self.client.get(reverse('posts:post_events')).status_code, 404)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, reverse('posts:post_events_poll'))
+        self.assertNotContains(response, 'EventSource(')
+
+    def poll(self, **params):
+        return self.client.get(
+            reverse('posts:post_events_poll'), params).json()
+
+    def test_poll_starts_from_newest_post(self):
+        """Первый опрос без after отдает id самого нового поста ленты."""
+        post_id = EventsViewTest.post.id
+        self.assertEqual(self.poll(), {'count': 0, 'last': post_id})
+        self.assertEqual(
+            self.poll(after=post_id), {'count': 0, 'last': post_id})
+
+    def test_poll_counts_posts_between_polls(self):
+        """Посты, вышедшие между опросами, попадают в следующий ответ."""
+        last = self.poll(group='group')['last']
+        first = Post.objects.create(
+            text='Первый', author=EventsViewTest.author,
+            group=EventsViewTest.group)
+        Post.objects.create(text='Без группы', author=EventsViewTest.author)
+        second = Post.objects.create(
+            text='Второй', author=EventsViewTest.author,
+            group=EventsViewTest.group)
+
+        self.assertEqual(
+            self.poll(group='group', after=last),
+            {'count': 2, 'last': second.id})
+        self.assertEqual(
+            self.poll(group='group', after=first.id),
+            {'count': 1, 'last': second.id})
+
+    @override_settings(EVENTS_POLL_TIMEOUT=0.05)
+    def test_long_poll_timeout(self):
+        post_id = EventsViewTest.post.id
+        self.assertEqual(
+            self.poll(after=post_id), {'count': 0, 'last': post_id})
+
+    def test_follow_events_need_login(self):
+        response = self.client.get(reverse('posts:post_events'), {
+            'follow': ''})
+        self.assertEqual(response.status_code, 403)
+
+
+class PublishOnCommitTest(TransactionTestCase):
+    def test_new_post_published_after_commit(self):
+        author = User.objects.create_user(username='author')
+        with get_broker().subscribe([events.FEED_CHANNEL]) as subscription:
+            post = Post.objects.create(text='Пост', author=author)
+            self.assertEqual(
+                subscription.get(timeout=1),
+                (events.FEED_CHANNEL, {'post_id': post.id}))
+
+    @override_settings(EVENTS_POLL_TIMEOUT=5)
+    def test_long_poll_waits_for_post(self):
+        """Long-poll ждет пост, опубликованный во время запроса."""
+        author = User.objects.create_user(username='author')
+        after = Post.objects.create(text='Старый', author=author).id
+        timer = threading.Timer(0.1, Post.objects.create, kwargs={
+            'text': 'Новый', 'author': author})
+        timer.start()
+        response = self.client.get(
+            reverse('posts:post_events_poll'), {'after': after})
+        timer.join()
+
+        self.assertEqual(response.json(), {'count': 1, 'last': after + 1})
@@ -0,0 +1,119 @@
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.routers import read_from_replica
+
+from posts.feed import get_follow_feed, pull
+from posts.models import FeedEntry, Follow, Post, User
+
+
+class FeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(
+            text='Старый пост',
+            author=cls.author
+        )
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка добавляет посты автора в ленту, отписка убирает."""
+        Follow.objects.create(user=FeedTest.reader, author=FeedTest.author)
+        self.assertTrue(
+            FeedEntry.objects.filter(
+                user=FeedTest.reader, post=FeedTest.old_post).exists()
+        )
+
+        Follow.objects.filter(
+            user=FeedTest.reader, author=FeedTest.author).delete()
+        self.assertFalse(
+            FeedEntry.objects.filter(user=FeedTest.reader).exists()
+        )
+
+    def test_new_post_fans_out(self):
+        """Новый пост сразу попадает в ленты подписчиков."""
+        Follow.objects.create(user=FeedTest.reader, author=FeedTest.author)
+        post = Post.objects.create(text='Новый пост', author=FeedTest.author)
+
+        self.assertEqual(get_follow_feed(FeedTest.reader)[0].post, post)
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_prolific_author_read_on_demand(self):
+        """Посты авторов без fan-out подтягиваются при чтении ленты."""
+        Follow.objects.create(user=FeedTest.reader, author=FeedTest.author)
+        post = Post.objects.create(text='Новый пост', author=FeedTest.author)
+
+        self.assertFalse(
+            FeedEntry.objects.filter(
+                user=FeedTest.reader, post=post).exists()
+        )
+        self.assertEqual(get_follow_feed(FeedTest.reader)[0].post, post)
+
+    @override_settings(FEED_FANOUT_LIMIT=0, FEED_BACKFILL_SIZE=2)
+    def test_pull_has_no_gaps(self):
+        """Все посты новее уже разложенных попадают в ленту, даже если
+        их больше FEED_BACKFILL_SIZE."""
+        Follow.objects.create(user=FeedTest.reader, author=FeedTest.author)
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=FeedTest.author)
+            for i in range(5)
+        ]
+        feed = get_follow_feed(FeedTest.reader)
+        self.assertEqual(
+            {entry.post_id for entry in feed},
+            {post.pk for post in posts} | {FeedTest.old_post.pk})
+
+    @override_settings(
+        FEED_FANOUT_LIMIT=0, REPLICA_DATABASES=['missing_replica'])
+    def test_pull_reads_primary(self):
+        """pull внутри read_from_replica читает из default."""
+        Follow.objects.create(user=FeedTest.reader, author=FeedTest.author)
+        post = Post.objects.create(text='Новый пост', author=FeedTest.author)
+        request = RequestFactory().get('/')
+        read_from_replica(lambda request: pull(FeedTest.reader))(request)
+        self.assertTrue(
+            FeedEntry.objects.filter(
+                user=FeedTest.reader, post=post).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_pull_queries_do_not_grow_with_authors(self):
+        """pull читает все авторы без fan-out тремя запросами и пишет
+        одной вставкой, сколько бы их ни было в подписках."""
+        authors = [
+            User.objects.create_user(username=f'prolific{i}')
+            for i in range(3)
+        ]
+        for author in authors:
+            Follow.objects.create(user=FeedTest.reader, author=author)
+            Post.objects.create(text='Старый пост', author=author)
+        pull(FeedTest.reader)
+        posts = [
+            Post.objects.create(text='Новый пост', author=author)
+            for author in authors
+        ]
+
+        with self.assertNumQueries(4):
+            pull(FeedTest.reader)
+        self.assertEqual(
+            FeedEntry.objects.filter(
+                user=FeedTest.reader, post__in=posts).count(),
+            len(posts))
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_not_modified_follow_page_does_not_write(self):
+        """Проверка свежести ленты подписок не дочитывает в нее посты."""
+        self.client.force_login(FeedTest.reader)
+        Follow.objects.create(user=FeedTest.reader, author=FeedTest.author)
+        url = reverse('posts:follow_index')
+        etag = self.client.get(url)['ETag']
+        post = Post.objects.create(text='Новый пост', author=FeedTest.author)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        FeedEntry.objects.filter(post=post).delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
@@ -1,11 +1,14 @@
+import hashlib
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django import forms
+from PIL import Image
 
 from posts.forms import PostForm
 from posts.models import Post, Comment
@@ -58,6 +61,9 @@ class FormsTest(TestCase):
             b'\x00\x00\x01\x00\x01\x00\x00\x02'
             b'\x02\x4c\x01\x00\x3b'
         )
+        digest = hashlib.sha256(self.small_gif).hexdigest()
+        self.small_gif_name = (
+            f'posts/{digest[:2]}/{digest[2:4]}/{digest}.gif')
         self.post_id = FormsTest.post.id
         self.guest_client = Client()
         self.authorized_client = Client()
@@ -93,7 +99,7 @@ class FormsTest(TestCase):
             Post.objects.filter(
                 text='Текст из формы',
                 author=FormsTest.user,
-                image='posts/small.gif',
+                image=self.small_gif_name,
                 group=FormsTest.group
             ).exists()
         )
@@ -126,7 +132,7 @@ class FormsTest(TestCase):
                 id=self.post_id,
                 text=form_data['text'],
                 author=FormsTest.user,
-                image='posts/sma.gif',
+                image=self.small_gif_name,
                 group=FormsTest.group
             ).exists()
         )
@@ -223,3 +229,47 @@ class FormsTest(TestCase):
                 author=FormsTest.user
             ).exists()
         )
+
+    def post_image(self, name, content):
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': name,
+                'image': SimpleUploadedFile(name, content, 'image/jpeg'),
+            },
+        )
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_form_normalizes_image(self):
+        """Большая картинка уменьшается, EXIF удаляется."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        buffer = BytesIO()
+        Image.new('RGB', (400, 200)).save(buffer, 'JPEG', exif=exif)
+
+        self.post_image('big.jpg', buffer.getvalue())
+
+        post = Post.objects.get(text='big.jpg')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (100, 50))
+            self.assertFalse(image.getexif())
+
+    @override_settings(POST_IMAGE_MAX_BYTES=10)
+    def test_form_rejects_large_file(self):
+        """Файл больше лимита не сохраняется."""
+        count_before = Post.objects.count()
+
+        response = self.post_image('small.gif', self.small_gif)
+
+        self.assertEqual(Post.objects.count(), count_before)
+        self.assertTrue(response.context['form'].errors['image'])
+
+    def test_form_deduplicates_images(self):
+        """Одинаковые картинки хранятся одним файлом."""
+        self.post_image('first.gif', self.small_gif)
+        self.post_image('second.gif', self.small_gif)
+
+        first = Post.objects.get(text='first.gif')
+        second = Post.objects.get(text='second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image.name, self.small_gif_name)
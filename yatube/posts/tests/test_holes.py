@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Post, User
+
+
+class HolesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(HolesTest.reader)
+
+    def test_shell_is_same_for_everyone(self):
+        """Гость и пользователь получают одну и ту же оболочку."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        guest = self.client.get(url)
+        reader = self.reader_client.get(url)
+
+        self.assertEqual(guest.content, reader.content)
+        self.assertContains(reader, 'data-hole="comment_form"')
+        self.assertContains(reader, 'Войти')
+        self.assertNotContains(reader, 'csrfmiddlewaretoken')
+
+    def test_holes_for_user(self):
+        """Фрагменты рисуются для пользователя запроса."""
+        response = self.reader_client.get(reverse('holes'), {
+            'user_menu': '',
+            'follow_button': 'username=author',
+            'comment_form': f'post_id={self.post.id}',
+            'post_actions': f'post_id={self.post.id}&author=author',
+            'unknown': '',
+        })
+        fragments = response.json()
+
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('reader', fragments['user_menu'])
+        self.assertIn('Отписаться', fragments['follow_button'])
+        self.assertIn('csrfmiddlewaretoken', fragments['comment_form'])
+        self.assertEqual(fragments['post_actions'], '')
+        self.assertNotIn('unknown', fragments)
+
+    def test_holes_with_wrong_params_skipped(self):
+        """Лишний или пропущенный параметр не роняет ответ."""
+        response = self.reader_client.get(reverse('holes'), {
+            'user_menu': 'view_name=posts:post_create',
+            'follow_button': '',
+            'comment_form': f'post_id={self.post.id}&extra=1',
+        })
+        fragments = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(fragments), ['user_menu'])
+
+    def test_user_menu_highlights_page(self):
+        """Меню выделяет пункт страницы, а не /holes/."""
+        fragments = self.reader_client.get(reverse('holes'), {
+            'user_menu': 'view_name=posts:post_create',
+        }).json()
+        self.assertIn('nav-link active', fragments['user_menu'])
+
+        response = self.reader_client.get(reverse('posts:post_create'))
+        self.assertContains(response, 'nav-link active')
+
+    def test_holes_for_guest(self):
+        fragments = self.client.get(reverse('holes'), {
+            'user_menu': '',
+            'comment_form': f'post_id={self.post.id}',
+        }).json()
+
+        self.assertIn('Войти', fragments['user_menu'])
+        self.assertEqual(fragments['comment_form'], '')
+
+    def test_regular_pages_render_holes_inline(self):
+        """Вне оболочки фрагменты рисуются сразу для пользователя."""
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertNotContains(response, 'data-hole')
@@ -0,0 +1,78 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import registry
+from posts.models import Post, User
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+
+    def metrics(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_request_metrics_by_view(self):
+        """Запрос попадает в метрики со своим view_name."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        metrics = self.metrics()
+
+        self.assertIn(
+            'yatube_requests_total{view="posts:index",method="GET",'
+            'status="200"} 2', metrics)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            metrics)
+        self.assertIn(
+            'yatube_cache_events_total{view="posts:index",cache="page",'
+            'event="hit"} 1', metrics)
+        self.assertIn('# TYPE yatube_db_queries_total counter', metrics)
+        db_queries = next(
+            line for line in metrics.splitlines()
+            if line.startswith('yatube_db_queries_total{view="posts:index"}'))
+        self.assertGreater(float(db_queries.split()[-1]), 0)
+
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, '
+            r'cache;desc=".+", total;dur=[\d.]+$')
+
+    @override_settings(SERVER_TIMING=False)
+    def test_metrics_access(self):
+        """Нужен токен или сотрудник, локальный адрес не помогает."""
+        for headers in (
+            {'REMOTE_ADDR': '127.0.0.1'},
+            {'HTTP_AUTHORIZATION': 'Bearer wrong'},
+        ):
+            with self.subTest(headers=headers):
+                response = self.client.get(reverse('metrics'), **headers)
+                self.assertEqual(response.status_code, 403)
+                self.assertFalse(response.has_header('Server-Timing'))
+
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(
+            self.client.get(reverse('metrics')).status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_without_token_setting(self):
+        """Пустой METRICS_TOKEN не открывает метрики пустым токеном."""
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, 403)
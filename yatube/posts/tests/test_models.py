@@ -1,6 +1,9 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Group, Post, User
+from posts.models import AuthorStats, Comment, Follow, Group, Post, User
 
 
 class PostModelTest(TestCase):
@@ -41,3 +44,47 @@ class PostModelTest(TestCase):
             act_post,
             result_post,
             'Не корректная работа метода __str__ Post')
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+
+    def test_counters_follow_changes(self):
+        """Счетчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(author=CountersTest.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=CountersTest.user, text='Комментарий')
+        follow = Follow.objects.create(
+            user=CountersTest.user, author=CountersTest.author)
+
+        stats = AuthorStats.objects.get(user=CountersTest.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=CountersTest.user).following_count,
+            1)
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 1)
+
+        comment.delete()
+        follow.delete()
+        post.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 0)
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_reconcile_counters_fixes_drift(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        Post.objects.bulk_create(
+            Post(author=CountersTest.author, text='Пост') for _ in range(3))
+        AuthorStats.objects.filter(user=CountersTest.user).delete()
+
+        call_command('reconcile_counters', stdout=StringIO())
+
+        self.assertEqual(
+            AuthorStats.objects.get(user=CountersTest.author).posts_count, 3)
+        self.assertTrue(
+            AuthorStats.objects.filter(user=CountersTest.user).exists())
@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import resolve, reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.utils import QueryBudgetMixin, QueryPlanMixin
+
+
+class QueryBudgetTest(QueryBudgetMixin, QueryPlanMixin, TestCase):
+    """Число запросов страницы не зависит от числа постов на ней."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        for number in range(12):
+            author = User.objects.create_user(username=f'user{number}')
+            group = Group.objects.create(
+                title=f'Группа {number}',
+                slug=f'group{number}',
+                description='Описание')
+            Post.objects.create(text='Пост', author=author, group=group)
+            Post.objects.create(
+                text='Пост автора', author=cls.author, group=group)
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.post = Post.objects.filter(author=cls.author).first()
+        for number in range(5):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(QueryBudgetTest.reader)
+
+    def pages(self):
+        author = QueryBudgetTest.author
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group0'}),
+            reverse('posts:profile', kwargs={'username': author}),
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': QueryBudgetTest.post.id}),
+            reverse('posts:follow_index'),
+        ]
+
+    def test_pages_query_budget(self):
+        """Страницы укладываются в бюджет, объявленный query_budget."""
+        for url in self.pages():
+            with self.subTest(url=url):
+                self.assertPageBudget(
+                    self.client, url, resolve(url).func.query_budget)
+
+    def test_pages_use_indexes(self):
+        """Запросы страниц не сканируют таблицы и не сортируют в памяти."""
+        for url in self.pages():
+            cache.clear()
+            self.assertIndexedPage(self.client, url)
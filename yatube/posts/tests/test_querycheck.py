@@ -0,0 +1,63 @@
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve
+
+from core.querycheck import (QueryCheckError, QueryCheckMiddleware,
+                             QueryReport, normalize, query_budget)
+from posts.models import Group, Post, User
+
+
+class QueryCheckTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {i}', slug=f'group{i}', description='Описание')
+            for i in range(3)
+        ]
+        for group in cls.groups:
+            Post.objects.create(text='Текст', author=cls.author, group=group)
+
+    def test_normalize_ignores_literals(self):
+        """Запросы, отличающиеся только литералами, совпадают."""
+        self.assertEqual(
+            normalize("SELECT * FROM t WHERE id = 1 AND s = 'a''b'"),
+            normalize("SELECT *  FROM t WHERE id = 25 AND s = 'c'"))
+        self.assertEqual(
+            normalize('SELECT * FROM t WHERE id IN (1, 2, 3)'),
+            'SELECT * FROM t WHERE id IN (...)')
+
+    def test_report_finds_n_plus_one_in_template(self):
+        """N+1 из шаблона находится вместе с именем шаблона."""
+        template = Template(
+            '{% for post in posts %}{{ post.group.title }}{% endfor %}')
+        template.origin.template_name = 'n_plus_one.html'
+        with QueryReport() as report:
+            template.render(Context({'posts': Post.objects.all()}))
+        repeated = report.repeated(3)
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(len(repeated[0]), 3)
+        self.assertIn('template n_plus_one.html', repeated[0][0].stack)
+        self.assertTrue(report.problems())
+
+    def test_budget_and_strict_mode(self):
+        """При QUERY_CHECK_STRICT превышение бюджета роняет запрос."""
+        @query_budget(1)
+        def view(request):
+            list(Group.objects.all())
+            list(Post.objects.all())
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.resolver_match = resolve('/')
+        request.resolver_match.func = view
+        middleware = QueryCheckMiddleware(lambda request: view(request))
+        with override_settings(QUERY_CHECK=True, QUERY_CHECK_STRICT=True):
+            with self.assertRaisesMessage(
+                    QueryCheckError, '2 запросов при бюджете 1'):
+                middleware(request)
+        with override_settings(QUERY_CHECK=True, QUERY_CHECK_STRICT=False):
+            with self.assertLogs('yatube.queries', 'WARNING'):
+                self.assertEqual(middleware(request).status_code, 200)
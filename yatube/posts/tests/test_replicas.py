@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.test_runner import TEST_REPLICA
+from posts.models import Post, User
+
+
+@override_settings(REPLICA_DATABASES=[TEST_REPLICA])
+class ReplicaRoutingTest(TransactionTestCase):
+    # Зеркало — другое соединение: данные незакоммиченной транзакции
+    # TestCase ему не видны.
+    databases = {'default', TEST_REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author')
+        self.post = Post.objects.create(text='Пост', author=self.user)
+        self.client.force_login(self.user)
+
+    def get_profile(self):
+        """Запросы к базам при открытии профиля: (default, реплика)."""
+        cache.clear()
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[TEST_REPLICA]) as replica:
+            response = self.client.get(
+                reverse('posts:profile', args=[self.user.username]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.post.text)
+        return primary, replica
+
+    def post_queries(self, queries):
+        return [
+            query['sql'] for query in queries
+            if '"posts_post"' in query['sql']
+        ]
+
+    def test_reads_go_to_replica(self):
+        """Чтение в помеченных представлениях идет в реплику."""
+        primary, replica = self.get_profile()
+        self.assertTrue(self.post_queries(replica))
+        self.assertFalse(self.post_queries(primary))
+
+    def test_pinned_to_primary_after_write(self):
+        """После записи пользователь читает из основной базы."""
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': 'Комментарий'})
+        primary, replica = self.get_profile()
+        self.assertFalse(replica.captured_queries)
+        self.assertTrue(self.post_queries(primary))
@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, User
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.cats = Post.objects.create(
+            text='Котики гуляют по крыше', author=cls.user)
+        cls.dogs = Post.objects.create(
+            text='Собака спит', author=cls.user)
+
+    def test_search_finds_word_forms(self):
+        """Поиск находит посты по другим формам слов."""
+        for query in ('котик', 'гулять', 'КОТИКАМИ крыша'):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    reverse('posts:search'), {'q': query})
+                self.assertEqual(response.context['posts'], [self.cats])
+
+    def test_search_index_follows_edits(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        self.dogs.text = 'Котик спит'
+        self.dogs.save()
+        response = self.client.get(reverse('posts:search'), {'q': 'котик'})
+        self.assertEqual(len(response.context['posts']), 2)
+
+        self.dogs.delete()
+        response = self.client.get(reverse('posts:search'), {'q': 'спит'})
+        self.assertEqual(response.context['posts'], [])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет по полнотекстовому индексу."""
+        admin = site._registry[Post]
+        request = RequestFactory().get('/admin/posts/post/')
+        queryset, _ = admin.get_search_results(
+            request, Post.objects.all(), 'котики')
+        self.assertEqual(list(queryset), [self.cats])
+
+    def test_stemmer_per_thread(self):
+        """Потоки стеммят параллельно, не деля стеммер."""
+        words = ['подписками', 'комментариев', 'публикации'] * 200
+        expected = [search._stemmer('russian').stemWord(w) for w in words]
+
+        started = threading.Barrier(4)
+
+        def run(_):
+            started.wait()
+            stemmer = search._stemmer('russian')
+            return stemmer, [stemmer.stemWord(word) for word in words]
+
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(run, range(4)))
+        for stemmer, stems in results:
+            self.assertEqual(stems, expected)
+        self.assertEqual(len({id(stemmer) for stemmer, _ in results}), 4)
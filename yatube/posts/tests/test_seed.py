@@ -0,0 +1,61 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+from django.test import TestCase
+
+from posts import datagen
+from posts.models import AuthorStats, Comment, Follow, Post, User
+
+
+class SeedTest(TestCase):
+
+    def seed(self, **options):
+        call_command('seed', stdout=StringIO(), **options)
+
+    def test_seed_counts(self):
+        """seed создает заданное число строк и пишет итог."""
+        out = StringIO()
+        call_command(
+            'seed', users=30, groups=2, posts=100, follows=0, comments=50,
+            batch_size=40, stdout=out)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertIn('Post: +100', out.getvalue())
+
+    def test_batches_do_not_depend_on_workers(self):
+        """Одинаковый seed дает одинаковые строки при любом числе
+        процессов."""
+        seeder = datagen.Seeder(seed=7, batch_size=30)
+        seeder.state.update({
+            'user_ids': list(range(1, 51)),
+            'user_weights': datagen.fake.power_law(50, 1.0),
+            'group_ids': [1, 2],
+            'totals': {'posts': 100},
+        })
+        inline = list(seeder.batches('posts', 100))
+        seeder.workers = 2
+        self.assertEqual(list(seeder.batches('posts', 100)), inline)
+        self.assertEqual(sum(map(len, inline)), 100)
+
+    def test_distributions(self):
+        """Подписчики и посты распределены по закону Ципфа, комментарии
+        сосредоточены на горячих постах."""
+        self.seed(
+            users=100, groups=1, posts=500, follows=1000, comments=500,
+            skew=1.5, hot_posts=0.02, hot_share=0.8)
+        self.assertEqual(Follow.objects.count(), 1000)
+        followers = sorted(
+            AuthorStats.objects.values_list('followers_count', flat=True),
+            reverse=True)
+        self.assertGreater(followers[0], 10 * followers[50])
+        hot = Post.objects.annotate(
+            total=Count('comments')).order_by('-pk')[:10]
+        self.assertGreaterEqual(
+            sum(post.total for post in hot), 0.7 * Comment.objects.count())
+
+    def test_invalid_options(self):
+        with self.assertRaises(CommandError):
+            self.seed(hot_share=2)
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.signals import release_image
+from posts.thumbnails import (PENDING_TIMEOUT, cached_variants, generate,
+                              pending_key)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=ThumbnailTest.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+
+    def test_placeholder_until_variants_ready(self):
+        """До генерации вариантов страница показывает заглушку."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+
+        self.assertIsNone(cached_variants(self.post.image))
+        self.assertContains(self.client.get(url), 'bg-light')
+
+        generate(self.post.id)
+        variants = cached_variants(self.post.image)
+
+        self.assertIsNotNone(variants)
+        self.assertEqual(
+            {width for _, width in variants}, set(settings.POST_IMAGE_WIDTHS))
+        response = self.client.get(url)
+        for (_, width), thumbnail in variants.items():
+            with self.subTest(width=width):
+                self.assertContains(response, f'{thumbnail.url} {width}w')
+
+    def test_list_pages_change_after_generate(self):
+        """Готовые варианты меняют ETag и кеш списков с постом."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', args=[ThumbnailTest.user.username]),
+        ]
+        # Как после PostForm: превью в очереди, страницы с заглушкой.
+        cache.set(pending_key(self.post.image.name), True, PENDING_TIMEOUT)
+        etags = [self.client.get(url)['ETag'] for url in urls]
+
+        generate(self.post.id)
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, '<picture')
+
+    @override_settings(IMAGE_RELEASE_GRACE=0)
+    def test_shared_image_deleted_with_last_post(self):
+        """Общий файл удаляется только вместе с последним постом."""
+        other = Post.objects.create(
+            text='Та же картинка',
+            author=ThumbnailTest.user,
+            image=SimpleUploadedFile('copy.gif', SMALL_GIF, 'image/gif')
+        )
+        name = other.image.name
+        storage = other.image.storage
+        self.assertEqual(name, self.post.image.name)
+
+        other.delete()
+        release_image(name)
+        self.assertTrue(storage.exists(name))
+
+        self.post.delete()
+        release_image(name)
+        self.assertFalse(storage.exists(name))
+
+    def test_reuploaded_image_kept_for_grace_period(self):
+        """Файл, загруженный заново, не удаляется до конца
+        IMAGE_RELEASE_GRACE, даже если постов с ним еще нет."""
+        name = self.post.image.name
+        storage = self.post.image.storage
+        path = storage.path(name)
+        os.utime(path, (0, 0))
+        self.post.delete()
+        storage.save('posts/again.gif', SimpleUploadedFile(
+            'again.gif', SMALL_GIF, 'image/gif'))
+        self.assertFalse(release_image(name))
+        self.assertTrue(storage.exists(name))
+
+        os.utime(path, (0, 0))
+        call_command('sweep_images', stdout=StringIO())
+        self.assertFalse(storage.exists(name))
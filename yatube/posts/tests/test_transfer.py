@@ -0,0 +1,136 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts import transfer
+from posts.models import (AuthorStats, Comment, FeedEntry, Follow, Group,
+                          Post, User)
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author,
+                group=cls.group if i % 2 else None)
+            for i in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'posts.ndjson.gz')
+
+    def export(self):
+        call_command('export_posts', self.path, stdout=StringIO())
+
+    def load(self, **options):
+        call_command('import_posts', self.path, stdout=StringIO(), **options)
+
+    def snapshot(self):
+        return {
+            'posts': list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'pub_date', 'author__username',
+                'group__slug')),
+            'comments': list(Comment.objects.values_list(
+                'pk', 'post_id', 'author__username', 'text')),
+            'follows': list(Follow.objects.values_list(
+                'user__username', 'author__username')),
+            'groups': list(Group.objects.values_list('slug', 'title')),
+        }
+
+    def test_round_trip(self):
+        """Выгрузка загружается в пустую базу без потерь, с
+        пересчитанными счетчиками и лентами."""
+        expected = self.snapshot()
+        self.export()
+        with gzip.open(self.path, 'rt', encoding='utf-8') as file:
+            self.assertEqual(
+                json.loads(file.readline())['format'], transfer.FORMAT)
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+
+        self.load()
+        self.assertEqual(self.snapshot(), expected)
+        author = User.objects.get(username='author')
+        self.assertEqual(AuthorStats.objects.get(user=author).posts_count, 5)
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[0].pk).comments_count, 1)
+        self.assertEqual(FeedEntry.objects.count(), 5)
+        self.assertFalse(author.has_usable_password())
+        self.assertFalse(os.path.exists(transfer.progress_path(self.path)))
+
+    def test_import_is_upsert(self):
+        """Повторная загрузка обновляет строки, а не дублирует."""
+        self.export()
+        Post.objects.filter(pk=self.posts[1].pk).update(text='Изменен')
+        self.load()
+        self.load()
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[1].pk).text, 'Пост 1')
+
+    def test_refuses_to_overwrite_other_rows(self):
+        """Занятый другим постом id не перезаписывается без --replace."""
+        self.export()
+        post = self.posts[2]
+        other = User.objects.create_user(username='other')
+        Post.objects.filter(pk=post.pk).update(author=other, text='Чужой')
+        with self.assertRaisesMessage(CommandError, f'id={post.pk}'):
+            self.load()
+        self.assertEqual(Post.objects.get(pk=post.pk).text, 'Чужой')
+
+    def test_replace_refreshes_feed(self):
+        """--replace перезаписывает строки, и ленты следуют за постом."""
+        self.export()
+        post = self.posts[2]
+        other = User.objects.create_user(username='other')
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=fan, author=other)
+        moved = post.pub_date - timedelta(days=30)
+        Post.objects.filter(pk=post.pk).update(author=other, pub_date=moved)
+        FeedEntry.objects.filter(post=post).delete()
+        FeedEntry.objects.create(
+            user=fan, post=post, author=other, pub_date=moved)
+
+        self.load(replace=True)
+        self.assertEqual(
+            set(FeedEntry.objects.filter(post=post).values_list(
+                'user__username', 'author__username', 'pub_date')),
+            {('reader', 'author', post.pub_date)})
+
+    def test_resume(self):
+        """--resume пропускает строки, загруженные до обрыва."""
+        self.export()
+        Group.objects.filter(slug='group').update(title='Изменена')
+        Post.objects.filter(pk=self.posts[4].pk).delete()
+        with open(transfer.progress_path(self.path), 'w') as file:
+            # Заголовок и группа уже загружены.
+            file.write('2')
+        self.load(resume=True)
+        self.assertEqual(Group.objects.get(slug='group').title, 'Изменена')
+        self.assertTrue(Post.objects.filter(pk=self.posts[4].pk).exists())
+
+    def test_rejects_foreign_file(self):
+        with open(self.path.replace('.gz', ''), 'w') as file:
+            file.write('{"model": "post"}\n')
+        with self.assertRaises(CommandError):
+            call_command(
+                'import_posts', self.path.replace('.gz', ''),
+                stdout=StringIO())
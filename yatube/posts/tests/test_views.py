@@ -3,7 +3,8 @@ from django.urls import reverse
 from django import forms
 from django.core.cache import cache
 
-from posts.models import Group, Post, User, Follow
+from posts.models import Comment, Group, Post, User, Follow
+from posts.views import COMMENTS_PER_PAGE
 
 
 class TestViews(TestCase):
@@ -129,20 +130,26 @@ class TestViews(TestCase):
                 self.assertRedirects(respon, redir)
 
     def test_cahce_index(self):
-        """Тестирование эширования главной страницы."""
-        response = self.authorized_client.get(reverse('posts:index'))
-        posts = response.content
-        Post.objects.create(
+        """Тестирование кеширования карточек постов.
+
+        Карточка берется из кеша, пока пост не сохранен,
+        и перерисовывается сразу после сохранения.
+        """
+        post = Post.objects.create(
             text='TestPost',
             author=TestViews.user
         )
+        self.authorized_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=post.pk).update(text='NoSignalText')
         response_old = self.authorized_client.get(reverse('posts:index'))
-        old_posts = response_old.content
-        self.assertEqual(old_posts, posts)
-        cache.clear()
+        self.assertContains(response_old, 'TestPost')
+        self.assertNotContains(response_old, 'NoSignalText')
+
+        post.text = 'EditedPost'
+        post.save()
         response_new = self.authorized_client.get(reverse('posts:index'))
-        new_posts = response_new.content
-        self.assertNotEqual(old_posts, new_posts)
+        self.assertContains(response_new, 'EditedPost')
+        self.assertNotContains(response_new, 'TestPost')
 
     def test_namespace_and_name_pattern(self):
         """URL-адрес использует соответствующий шаблон."""
@@ -179,6 +186,68 @@ class TestViews(TestCase):
         for reverse_name in url_for_page:
             with self.subTest(address=reverse_name):
                 response = self.authorized_client.get(reverse_name)
-                response_page_2 = self.client.get(reverse_name + '?page=2')
+                next_cursor = response.context['page_obj'].next_cursor
+                response_page_2 = self.client.get(
+                    reverse_name, {'cursor': next_cursor})
                 self.assertEqual(len(response.context['page_obj']), 10)
                 self.assertEqual(len(response_page_2.context['page_obj']), 3)
+
+    def test_paginator_cursor_navigation(self):
+        """Курсоры ведут вперед и назад без пропусков и повторов."""
+        address = reverse('posts:group_list', kwargs={'slug': 'testslug'})
+        first_page = self.client.get(address).context['page_obj']
+        second_page = self.client.get(
+            address, {'cursor': first_page.next_cursor}).context['page_obj']
+        back_page = self.client.get(
+            address,
+            {'cursor': second_page.previous_cursor}).context['page_obj']
+        last_page = self.client.get(
+            address, {'cursor': first_page.last_cursor}).context['page_obj']
+        broken_page = self.client.get(
+            address, {'cursor': 'broken'}).context['page_obj']
+
+        self.assertFalse(first_page.has_previous())
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(
+            len(set(first_page) | set(second_page)),
+            Post.objects.filter(group=TestViews.group).count()
+        )
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertFalse(back_page.has_previous())
+        self.assertEqual(list(last_page)[-3:], list(second_page))
+        self.assertEqual(list(broken_page), list(first_page))
+
+    def test_post_comments_pages(self):
+        """Комментарии поста отдаются страницами по курсору."""
+        post = Post.objects.filter(author=TestViews.user).first()
+        Comment.objects.bulk_create(
+            Comment(post=post, author=TestViews.author, text=f'Коммент {i}')
+            for i in range(COMMENTS_PER_PAGE + 5)
+        )
+        detail = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id}))
+        first_page = detail.context['comments']
+        address = reverse('posts:post_comments', kwargs={'post_id': post.id})
+        fragment = self.guest_client.get(
+            address, {'cursor': first_page.next_cursor})
+        data = self.guest_client.get(
+            address,
+            {'cursor': first_page.next_cursor, 'format': 'json'}).json()
+
+        self.assertEqual(len(first_page), COMMENTS_PER_PAGE)
+        self.assertContains(detail, address)
+        self.assertTemplateUsed(fragment, 'includes/comments.html')
+        self.assertEqual(len(fragment.context['comments']), 5)
+        self.assertNotContains(fragment, 'Показать еще')
+        self.assertEqual(len(data['comments']), 5)
+        self.assertIsNone(data['next_cursor'])
+        self.assertFalse(
+            {c.id for c in first_page} & {c['id'] for c in data['comments']})
+
+    def test_post_comments_missing_post(self):
+        """Комментарии несуществующего поста — 404."""
+        address = reverse('posts:post_comments', kwargs={'post_id': 10 ** 6})
+        self.assertEqual(self.guest_client.get(address).status_code, 404)
+        self.assertEqual(
+            self.guest_client.get(address, {'format': 'json'}).status_code,
+            404)
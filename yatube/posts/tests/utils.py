@@ -0,0 +1,60 @@
+"""Вспомогательные средства для тестов приложения posts."""
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверка, что страница укладывается в бюджет SQL-запросов."""
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                f'{number}. {query["sql"]}'
+                for number, query in enumerate(
+                    context.captured_queries, start=1)
+            )
+            self.fail(
+                f'{executed} запросов при бюджете {budget}:\n{queries}')
+
+    def assertPageBudget(self, client, url, budget):
+        """GET url выполняет не больше budget запросов."""
+        with self.assertQueryBudget(budget):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+FULL_SCAN_RE = re.compile(r'^SCAN (?!.*USING (COVERING )?INDEX)')
+TEMP_SORT_RE = re.compile(r'USE TEMP B-TREE')
+
+
+def query_plan(sql):
+    """Строки EXPLAIN QUERY PLAN для запроса SQLite."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class QueryPlanMixin:
+    """Проверка, что запросы страницы идут по индексам."""
+
+    def assertIndexedPage(self, client, url):
+        """Ни один SELECT страницы не сканирует таблицу и не сортирует."""
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            for step in query_plan(sql):
+                with self.subTest(url=url, step=step, sql=sql):
+                    self.assertIsNone(FULL_SCAN_RE.search(step))
+                    self.assertIsNone(TEMP_SORT_RE.search(step))
@@ -0,0 +1,156 @@
+"""Фоновая генерация превью картинок постов.
+
+Для каждой картинки создается набор вариантов: несколько ширин
+в каждом из форматов POST_IMAGE_FORMATS (AVIF, WebP и JPEG как
+запасной), чтобы шаблон мог отдать их через srcset. Варианты
+создаются в пуле потоков сразу после сохранения картинки
+в post_create/post_edit. Шаблоны только читают готовые варианты
+из хранилища sorl-thumbnail и показывают заглушку, пока их нет,
+поэтому запрос никогда не декодирует и не сжимает картинку сам.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.metrics import registry
+from .cards import bump_version
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Пропорции карточки поста: 960x339.
+ASPECT_RATIO = 339 / 960
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+}
+
+# Пока превью картинки создаются, шаблоны не ищут их в хранилище
+# sorl: иначе каждая такая карточка стоила бы запроса к базе.
+PENDING_TIMEOUT = 10 * 60
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.THUMBNAIL_WORKERS,
+    thread_name_prefix='thumbnails')
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def image_formats():
+    """Форматы из настроек, которые умеют записать Pillow и sorl.
+
+    Порядок важен: браузер берет первый поддерживаемый source,
+    последний формат используется как img src.
+    """
+    Image.init()
+    return [
+        image_format for image_format in settings.POST_IMAGE_FORMATS
+        if image_format in Image.SAVE and image_format in EXTENSIONS
+    ] or ['JPEG']
+
+
+def variants():
+    """Пары (формат, ширина) -> (geometry, options) для sorl."""
+    return {
+        (image_format, width): (
+            f'{width}x{round(width * ASPECT_RATIO)}',
+            {'crop': 'center', 'upscale': True, 'format': image_format})
+        for image_format in image_formats()
+        for width in settings.POST_IMAGE_WIDTHS
+    }
+
+
+def pending_key(name):
+    return f'thumbnails-pending:{name}'
+
+
+def _options(source, options):
+    """Опции превью с умолчаниями, как их дополняет sorl."""
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def _cached(source, geometry, options):
+    name = default.backend._get_thumbnail_filename(
+        source, geometry, _options(source, options))
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def cached_variants(image):
+    """Готовые варианты картинки {(формат, ширина): ImageFile}.
+
+    Возвращает None, если хотя бы одного варианта еще нет.
+    """
+    if not image or cache.get(pending_key(image.name)):
+        return None
+    source = ImageFile(image)
+    ready = {}
+    for variant, (geometry, options) in variants().items():
+        thumbnail = _cached(source, geometry, options)
+        if thumbnail is None:
+            return None
+        ready[variant] = thumbnail
+    return ready
+
+
+def generate(post_id):
+    """Создает все варианты картинки поста и сбрасывает кеш карточки
+    и страниц с ней: списки сверяются по версиям ленты и автора,
+    а не поста."""
+    post = Post.objects.only('image', 'author_id').filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    started = time.perf_counter()
+    for geometry, options in variants().values():
+        get_thumbnail(post.image, geometry, **options)
+    registry.observe(
+        'yatube_thumbnail_duration_seconds', time.perf_counter() - started)
+    cache.delete(pending_key(post.image.name))
+    bump_version('post', post_id)
+    bump_version('user', post.author_id)
+    bump_version('feed', 'all')
+
+
+def _run(post_id, task):
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception('Не удалось создать превью поста %s', post_id)
+    finally:
+        with _pending_lock:
+            _pending.discard(task)
+        connection.close()
+
+
+def schedule(post):
+    """Ставит генерацию превью в очередь после коммита транзакции."""
+    if not post.image:
+        return
+    task = (post.pk, post.image.name)
+    with _pending_lock:
+        if task in _pending:
+            return
+        _pending.add(task)
+    cache.set(pending_key(post.image.name), True, PENDING_TIMEOUT)
+    transaction.on_commit(lambda: _executor.submit(_run, post.pk, task))
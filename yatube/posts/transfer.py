@@ -0,0 +1,265 @@
+"""Перенос постов между окружениями в формате NDJSON.
+
+Файл — строка заголовка и по строке JSON на объект: сначала группы,
+затем посты, комментарии и подписки, так что при загрузке все, на что
+ссылается строка, уже загружено. Группы и пользователи связываются по
+slug и username, посты и комментарии сохраняют свои id, как
+в dumpdata/loaddata. Файлы с расширением .gz сжимаются gzip.
+
+Выгрузка читает таблицы через iterator(chunk_size), загрузка пишет
+пачками по batch_size строк, каждую в своей транзакции, поэтому память
+не растет с размером таблиц. Загрузка — upsert: повторная загрузка того
+же файла обновляет строки, а не дублирует их. Строка с тем же id
+считается тем же объектом, только если совпадают автор и дата (и пост
+у комментария); иначе в базе другой объект, и загрузка останавливается,
+если не передан replace. После каждой пачки число
+загруженных строк записывается в файл <путь>.progress, с которого
+прерванную загрузку можно продолжить. Сами картинки не переносятся:
+в файле только их имена в хранилище.
+"""
+import gzip
+import json
+import sys
+from collections import defaultdict
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, reset_queries, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils.dateparse import parse_datetime
+
+from . import feed, search
+from .cards import bump_version
+from .counters import reconcile
+from .datagen import explicit_dates
+from .models import Comment, FeedEntry, Follow, Group, Post, User
+
+FORMAT = 'yatube-posts'
+VERSION = 1
+MODELS = ('group', 'post', 'comment', 'follow')
+
+
+class TransferError(Exception):
+    pass
+
+
+def open_file(path, mode):
+    """Файл для чтения ('r') или записи ('w'), '-' — stdin/stdout."""
+    if path == '-':
+        return nullcontext(sys.stdin if mode == 'r' else sys.stdout)
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def progress_path(path):
+    return f'{path}.progress'
+
+
+def export_rows(chunk_size=2000):
+    """Заголовок и строки всех объектов в порядке загрузки."""
+    yield {'format': FORMAT, 'version': VERSION}
+    querysets = {
+        'group': Group.objects.values('slug', 'title', 'description'),
+        'post': Post.objects.values(
+            'id', 'text', 'pub_date', 'image',
+            author_name=F('author__username'),
+            group_slug=F('group__slug')),
+        'comment': Comment.objects.values(
+            'id', 'post_id', 'text', 'pub_date',
+            author_name=F('author__username')),
+        'follow': Follow.objects.values(
+            user_name=F('user__username'),
+            author_name=F('author__username')),
+    }
+    for model in MODELS:
+        rows = querysets[model].order_by('pk').iterator(chunk_size=chunk_size)
+        for row in rows:
+            yield {'model': model, **row}
+
+
+def _encode(value):
+    """Даты целиком: DjangoJSONEncoder отбросил бы микросекунды."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def export(file, chunk_size=2000):
+    """Пишет все объекты в file, возвращает число строк объектов."""
+    count = -1
+    for count, row in enumerate(export_rows(chunk_size)):
+        file.write(json.dumps(row, default=_encode, ensure_ascii=False))
+        file.write('\n')
+    return count
+
+
+def _parse(lines):
+    for number, line in lines:
+        try:
+            yield number, json.loads(line)
+        except ValueError as error:
+            raise TransferError(f'Строка {number}: {error}')
+
+
+class Importer:
+
+    def __init__(self, batch_size=1000, replace=False):
+        self.batch_size = batch_size
+        self.replace = replace
+        self.loaded = 0
+
+    def user_ids(self, usernames):
+        """id пользователей по username, недостающие создаются без
+        пароля: войти они смогут после сброса пароля."""
+        usernames = set(usernames)
+        ids = dict(User.objects.filter(
+            username__in=usernames).values_list('username', 'pk'))
+        missing = usernames - set(ids)
+        if missing:
+            password = make_password(None)
+            User.objects.bulk_create(
+                [User(username=name, password=password) for name in missing],
+                ignore_conflicts=True)
+            ids.update(User.objects.filter(
+                username__in=missing).values_list('username', 'pk'))
+        return ids
+
+    def upsert(self, model, objects, fields, identity):
+        """Обновляет объекты с существующими pk, остальные создает.
+
+        Если у строки с тем же pk другие поля identity, это другой
+        объект: без replace загрузка останавливается.
+        """
+        existing = {
+            pk: values for pk, *values in model.objects.filter(
+                pk__in=[obj.pk for obj in objects]
+            ).values_list('pk', *identity)
+        }
+        if not self.replace:
+            for obj in objects:
+                if obj.pk in existing and existing[obj.pk] != [
+                        getattr(obj, field) for field in identity]:
+                    raise TransferError(
+                        f'{model.__name__} id={obj.pk}: в базе другой '
+                        f'объект с этим id. Перезаписать — --replace.')
+        model.objects.bulk_update(
+            [obj for obj in objects if obj.pk in existing], fields)
+        model.objects.bulk_create(
+            [obj for obj in objects if obj.pk not in existing])
+        return existing
+
+    def groups(self, rows):
+        ids = dict(Group.objects.filter(
+            slug__in=[row['slug'] for row in rows]).values_list('slug', 'pk'))
+        groups = [
+            Group(pk=ids.get(row['slug']), slug=row['slug'],
+                  title=row['title'], description=row['description'])
+            for row in rows
+        ]
+        Group.objects.bulk_update(
+            [group for group in groups if group.pk], ['title', 'description'])
+        Group.objects.bulk_create(
+            [group for group in groups if not group.pk])
+
+    def posts(self, rows):
+        users = self.user_ids(row['author_name'] for row in rows)
+        groups = dict(Group.objects.filter(slug__in={
+            row['group_slug'] for row in rows if row['group_slug']
+        }).values_list('slug', 'pk'))
+        updated = self.upsert(Post, [
+            Post(
+                pk=row['id'], text=row['text'],
+                pub_date=parse_datetime(row['pub_date']),
+                image=row['image'] or '',
+                author_id=users[row['author_name']],
+                group_id=groups.get(row['group_slug']))
+            for row in rows
+        ], ['text', 'pub_date', 'image', 'author', 'group'],
+            identity=['author_id', 'pub_date'])
+        for pk in updated:
+            bump_version('post', pk)
+        if updated:
+            self.refresh_feed(updated)
+
+    def refresh_feed(self, post_ids):
+        """Записи лент обновленных постов: дата берется из поста,
+        а записи у подписчиков прежнего автора удаляются, новых
+        добавит backfill_follows в finish."""
+        post = Post.objects.filter(pk=OuterRef('post_id'))
+        entries = FeedEntry.objects.filter(post_id__in=post_ids)
+        entries.exclude(
+            author_id=Subquery(post.values('author_id')[:1])).delete()
+        entries.update(pub_date=Subquery(post.values('pub_date')[:1]))
+
+    def comments(self, rows):
+        users = self.user_ids(row['author_name'] for row in rows)
+        self.upsert(Comment, [
+            Comment(
+                pk=row['id'], post_id=row['post_id'], text=row['text'],
+                pub_date=parse_datetime(row['pub_date']),
+                author_id=users[row['author_name']])
+            for row in rows
+        ], ['post', 'text', 'pub_date', 'author'],
+            identity=['post_id', 'author_id', 'pub_date'])
+
+    def follows(self, rows):
+        users = self.user_ids(
+            name for row in rows
+            for name in (row['user_name'], row['author_name']))
+        Follow.objects.bulk_create([
+            Follow(
+                user_id=users[row['user_name']],
+                author_id=users[row['author_name']])
+            for row in rows
+        ], ignore_conflicts=True)
+
+    def apply(self, batch):
+        by_model = defaultdict(list)
+        for number, row in batch:
+            if row.get('model') not in MODELS:
+                raise TransferError(f'Строка {number}: неизвестный объект.')
+            by_model[row['model']].append(row)
+        with transaction.atomic():
+            for model in MODELS:
+                if by_model[model]:
+                    getattr(self, f'{model}s')(by_model[model])
+        reset_queries()
+
+    def load(self, file, skip=0, checkpoint=None):
+        """Загружает строки file после первых skip, checkpoint(n)
+        вызывается с числом обработанных строк после каждой пачки."""
+        lines = enumerate(file, start=1)
+        header = next(_parse(lines), (1, None))[1]
+        if header != {'format': FORMAT, 'version': VERSION}:
+            raise TransferError('Файл не похож на выгрузку export_posts.')
+        done = max(skip, 1)
+        rows = _parse(islice(lines, done - 1, None))
+        with explicit_dates(Post, Comment):
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self.apply(batch)
+                self.loaded += len(batch)
+                done = batch[-1][0]
+                if checkpoint:
+                    checkpoint(done)
+        self.finish()
+        return done
+
+    def finish(self):
+        """Счетчики, ленты, поиск и последовательности id после загрузки
+        без сигналов."""
+        with transaction.atomic():
+            reconcile()
+            feed.backfill_follows()
+            search.rebuild(Post.objects.all())
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                        no_style(), [Post, Comment]):
+                    cursor.execute(sql)
+        bump_version('feed', 'all')
@@ -0,0 +1,61 @@
+"""Обработка картинок, загружаемых в PostForm.
+
+Загрузки всегда пишутся на диск по частям (TemporaryFileUploadHandler),
+здесь они проверяются по размеру файла и числу пикселей, при
+необходимости поворачиваются по EXIF, очищаются от метаданных и
+уменьшаются до POST_IMAGE_MAX_SIDE.
+"""
+import hashlib
+import tempfile
+
+from django import forms
+from django.conf import settings
+from django.core.files import File
+from PIL import Image, ImageOps
+
+JPEG_QUALITY = 85
+
+
+def content_hash(upload):
+    """sha256 содержимого файла, читается по частям."""
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _normalize(upload, image):
+    image_format = image.format
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(
+        (settings.POST_IMAGE_MAX_SIDE, settings.POST_IMAGE_MAX_SIDE))
+    options = {'optimize': True}
+    if image_format == 'JPEG':
+        options['quality'] = JPEG_QUALITY
+    result = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+        dir=settings.FILE_UPLOAD_TEMP_DIR)
+    image.save(result, format=image_format, **options)
+    result.seek(0)
+    return File(result, name=upload.name)
+
+
+def process_image(upload):
+    """Проверяет и нормализует картинку."""
+    if upload.size > settings.POST_IMAGE_MAX_BYTES:
+        raise forms.ValidationError(
+            'Файл больше %(limit)d МБ.',
+            params={'limit': settings.POST_IMAGE_MAX_BYTES // 2 ** 20},
+        )
+    upload.seek(0)
+    image = Image.open(upload)
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise forms.ValidationError(
+            'Слишком большое изображение: %(width)dx%(height)d.',
+            params={'width': width, 'height': height},
+        )
+    if image.getexif() or max(width, height) > settings.POST_IMAGE_MAX_SIDE:
+        upload = _normalize(upload, image)
+    upload.seek(0)
+    return upload
@@ -21,6 +21,11 @@ urlpatterns = [
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
+    path('posts/<int:post_id>/comments/',
+         views.post_comments, name='post_comments'),
     path('create/', views.post_create, name='post_create'),
+    path('search/', views.search, name='search'),
+    path('events/', views.post_events, name='post_events'),
+    path('events/poll/', views.post_events_poll, name='post_events_poll'),
     path('', views.index, name='index'),
 ]
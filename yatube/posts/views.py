@@ -1,31 +1,55 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import Max
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render, get_object_or_404
-from django.views.decorators.cache import cache_page
-from django.core.paginator import Paginator
+from core.cache import shared_cache_page
+from core.conditional import conditional_page
+from core.querycheck import query_budget
+from core.paginator import KeysetPaginator
+from core.routers import pin_primary, read_from_replica
 from .models import Follow, Post, Group, User, Comment
 from .forms import PostForm, CommentForm
-
-
-@cache_page(20)
+from .cards import FEED_VERSION_KEY
+from .events import channels_for, feed_for, stream, wait
+from .feed import get_follow_feed
+from .freshness import (follow_state, group_state, index_state, post_state,
+                        profile_state)
+from .search import search as search_posts
+from .serializers import comment_data
+from .thumbnails import schedule as schedule_thumbnails
+
+COMMENTS_PER_PAGE = 20
+
+
+@query_budget(2)
+@read_from_replica
+@conditional_page(index_state, shared=True)
+@shared_cache_page(20, version_keys=(FEED_VERSION_KEY,))
 def index(request):
     """Главная страница проекта.
 
     Выводит последние 10 постов.
     """
-    post_list = Post.objects.select_related('author').all()
+    post_list = Post.objects.for_feed()
 
-    paginator = Paginator(post_list, 10)
+    paginator = KeysetPaginator(post_list, 10)
 
-    page_number = request.GET.get('page')
+    cursor = request.GET.get('cursor')
 
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginator.get_page(cursor)
 
     context = {
         'page_obj': page_obj,
+        'shell': True,
     }
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(3)
+@read_from_replica
+@conditional_page(group_state, shared=True)
 def group_posts(request, slug):
     """Страницца групп.
 
@@ -33,69 +57,98 @@ def group_posts(request, slug):
     """
     group = get_object_or_404(Group, slug=slug)
 
-    posts_list = group.posts.all()
+    posts_list = group.posts.for_feed()
 
-    paginator = Paginator(posts_list, 10)
+    paginator = KeysetPaginator(posts_list, 10)
 
-    page_number = request.GET.get('page')
+    cursor = request.GET.get('cursor')
 
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginator.get_page(cursor)
 
     context = {
         'group': group,
         'page_obj': page_obj,
+        'shell': True,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(3)
+@read_from_replica
+@conditional_page(profile_state, shared=True)
 def profile(request, username):
     """Страница просмотра профиля автора.
 
     Выводиться информация о колличестве постов автора и сами посты.
     """
-    user = get_object_or_404(User, username=username)
-
-    posts_list = user.posts.all()
+    user = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
 
-    paginator = Paginator(posts_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts_list = user.posts.for_feed()
 
-    is_author = not request.user == user
-
-    following = user.following.exists()
+    paginator = KeysetPaginator(posts_list, 10)
+    cursor = request.GET.get('cursor')
+    page_obj = paginator.get_page(cursor)
 
     context = {
         'page_obj': page_obj,
         'author': user,
-        'is_author': is_author,
-        'following': following
+        'shell': True,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(3)
+@read_from_replica
+@conditional_page(post_state, shared=True)
 def post_detail(request, post_id):
     """Страница просмотра отдельной записи.
 
     Видна вссе пользователям, которые перешли по ссылке.
-    Если перешел авто поста, будет видна кнопка редактирования поста.
+    Если перешел авто поста, будет видна кнопка редактирования поста,
+    а вошедшим пользователям — форма комментария (фрагменты core.holes).
     """
-    post = get_object_or_404(Post, id=post_id)
-    comments = Comment.objects.select_related('author').filter(post=post)
-
-    form = CommentForm(request.POST or None)
-    if form.is_valid():
-        return redirect('posts:add_comment', post_id)
+    post = get_object_or_404(Post.objects.for_detail(), id=post_id)
+    paginator = KeysetPaginator(
+        Comment.objects.for_post(post.id), COMMENTS_PER_PAGE)
+    comments = paginator.get_page(None)
 
     context = {
         'post': post,
         'comments': comments,
-        'form': form,
+        'shell': True,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(2)
+@read_from_replica
+@conditional_page(post_state, shared=True)
+def post_comments(request, post_id):
+    """Следующая страница комментариев поста.
+
+    Отдает HTML-фрагмент для кнопки «Показать еще»
+    или JSON, если передан параметр format=json.
+    """
+    paginator = KeysetPaginator(
+        Comment.objects.for_post(post_id), COMMENTS_PER_PAGE)
+    comments = paginator.get_page(request.GET.get('cursor'))
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [comment_data(comment) for comment in comments],
+            'next_cursor': comments.next_cursor,
+        })
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return render(request, 'includes/comments.html', context)
+
+
 @login_required
+@pin_primary
+@transaction.atomic
 def post_create(request):
     """Страница создания нового поста.
 
@@ -109,12 +162,14 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        schedule_thumbnails(post)
 
         return redirect('posts:profile', username=request.user)
     return render(request, 'posts/create_post.html', {'form': form})
 
 
 @login_required
+@pin_primary
 def post_edit(request, post_id):
     """Страница редактирования поста.
 
@@ -132,7 +187,9 @@ def post_edit(request, post_id):
         instance=post)
 
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnails(post)
         return redirect('posts:post_detail', post_id=post_id)
 
     is_edit = True
@@ -143,6 +200,8 @@ def post_edit(request, post_id):
 
 
 @login_required
+@pin_primary
+@transaction.atomic
 def add_comment(request, post_id):
     """Добавление комментария к посту."""
     post = get_object_or_404(Post, id=post_id)
@@ -155,13 +214,18 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+# Шесть запросов ленты и до трех на авторов без fan-out (pull).
+@query_budget(9)
 @login_required
+@read_from_replica
+@conditional_page(follow_state)
 def follow_index(request):
     """Страница с постами авторов на которых подписан user."""
-    author_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(author_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    feed_entries = get_follow_feed(request.user)
+    paginator = KeysetPaginator(feed_entries, 10)
+    cursor = request.GET.get('cursor')
+    page_obj = paginator.get_page(cursor)
+    page_obj.object_list = [entry.post for entry in page_obj]
 
     context = {
         'page_obj': page_obj,
@@ -170,6 +234,8 @@ def follow_index(request):
 
 
 @login_required
+@pin_primary
+@transaction.atomic
 def profile_follow(request, username):
     """Подписка на автора."""
     author = get_object_or_404(User, username=username)
@@ -184,8 +250,59 @@ def profile_follow(request, username):
 
 
 @login_required
+@pin_primary
+@transaction.atomic
 def profile_unfollow(request, username):
     """Отписка от автора."""
     user = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=user).delete()
     return redirect('posts:profile', username)
+
+
+def post_events(request):
+    """Поток SSE с уведомлениями о новых постах ленты.
+
+    Без EVENTS_STREAMING — 404: под WSGI каждая вкладка держала бы
+    воркер, и EventSource на 404 не переподключается.
+    """
+    if not settings.EVENTS_STREAMING:
+        raise Http404('Поток событий выключен.')
+    response = StreamingHttpResponse(
+        stream(channels_for(request)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def post_events_poll(request):
+    """Опрос новых постов ленты для клиентов без потока SSE.
+
+    after — id последнего известного клиенту поста. Без него сразу
+    отдается id самого нового поста ленты, с которого клиент начнет.
+    """
+    channels, posts = feed_for(request)
+    try:
+        after = int(request.GET['after'])
+    except (KeyError, ValueError):
+        last = posts.aggregate(last=Max('pk'))['last']
+        response = JsonResponse({'count': 0, 'last': last or 0})
+    else:
+        found = wait(channels, posts, after, settings.EVENTS_POLL_TIMEOUT)
+        response = JsonResponse({
+            'count': found['count'], 'last': found['last'] or after})
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def search(request):
+    """Поиск по текстам постов.
+
+    Выводит самые релевантные посты по запросу q.
+    """
+    query = request.GET.get('q', '').strip()
+    posts = search_posts(Post.objects.for_feed(), query)
+    context = {
+        'query': query,
+        'posts': posts,
+    }
+    return render(request, 'posts/search.html', context)
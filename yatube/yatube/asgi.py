@@ -0,0 +1,24 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no native ASGI handler, so the WSGI application is wrapped
+by core.asgi.WsgiToAsgi and runs in a thread pool of ASGI_THREADS workers;
+streaming responses are read in a separate pool of ASGI_STREAM_THREADS.
+
+Run it with any ASGI server, e.g. ``uvicorn yatube.asgi:application``.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WsgiToAsgi
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+wsgi_application = get_wsgi_application()
+
+application = WsgiToAsgi(
+    wsgi_application, settings.ASGI_THREADS, settings.ASGI_STREAM_THREADS)
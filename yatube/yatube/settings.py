@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -49,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.querycheck.QueryCheckMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,7 +66,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -72,7 +75,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'core.context_processors.year.year'
+                'core.context_processors.year.year',
+                'core.context_processors.events.events',
             ],
         },
     },
@@ -80,20 +84,101 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Потоки, в которых yatube/asgi.py выполняет запросы к Django.
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 8))
+# Потоки, из которых читаются потоковые ответы (SSE): каждый открытый
+# поток событий занимает один из них.
+ASGI_STREAM_THREADS = int(os.getenv('ASGI_STREAM_THREADS', 100))
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# Профиль базы выбирается переменной окружения DB_ENGINE.
+# sqlite: файл DB_NAME, при подключении включаются WAL и прагмы
+# из SQLITE_PRAGMAS, конкурентные записи ждут SQLITE_BUSY_TIMEOUT секунд.
+# postgresql: DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT; для
+# пула соединений DB_HOST указывает на PgBouncer, а DB_POOLER=pgbouncer
+# отключает серверные курсоры, несовместимые с transaction pooling.
+# Соединения переиспользуются между запросами CONN_MAX_AGE секунд.
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+CONN_MAX_AGE = int(os.getenv('CONN_MAX_AGE', 60))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'yatube'),
+            'USER': os.getenv('DB_USER', 'yatube'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', '127.0.0.1'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'DISABLE_SERVER_SIDE_CURSORS': (
+                os.getenv('DB_POOLER') == 'pgbouncer'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv(
+                'DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'OPTIONS': {
+                'timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 20)),
+            },
+        }
     }
+
+# Реплики для чтения: DB_REPLICAS — пути к файлам SQLite или хосты
+# PostgreSQL через запятую. Запись всегда идет в default.
+REPLICA_DATABASES = []
+for number, replica in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = dict(
+        DATABASES['default'],
+        **{'HOST' if DB_ENGINE == 'postgresql' else 'NAME': replica},
+        TEST={'MIRROR': 'default'},
+    )
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Сколько секунд после изменения данных пользователь читает из default.
+REPLICA_STICKY_SECONDS = 10
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 2 ** 20)),
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Бэкенд кеша выбирается переменной окружения CACHE_BACKEND.
+# locmem годится только для одного процесса; file и memcached общие
+# для всех воркеров, поэтому кеш страниц и карточек не дублируется.
+CACHE_BACKENDS = {
+    'locmem': (
+        'django.core.cache.backends.locmem.LocMemCache',
+        'yatube'),
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        os.path.join(BASE_DIR, 'cache')),
+    'memcached': (
+        'django.core.cache.backends.memcached.MemcachedCache',
+        '127.0.0.1:11211'),
 }
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', 300)),
     }
 }
 
@@ -148,3 +233,77 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Лента подписок: посты авторов, у которых подписчиков больше
+# FEED_FANOUT_LIMIT, не раскладываются по лентам при публикации,
+# а подтягиваются при чтении.
+FEED_FANOUT_LIMIT = 1000
+FEED_BACKFILL_SIZE = 100
+
+# Время жизни закешированной карточки поста, секунды.
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сколько секунд общий кеш (CDN, обратный прокси) может отдавать
+# страницу гостя без перепроверки на сервере.
+PUBLIC_PAGE_MAX_AGE = 20
+
+# Метрики запросов (core.metrics): токен, с которым Prometheus
+# забирает /metrics (без него — только сотрудники), и добавлять
+# ли к ответам заголовок Server-Timing.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+SERVER_TIMING = os.getenv('SERVER_TIMING', str(DEBUG)).lower() in (
+    'true', '1', 'yes')
+
+# Поиск N+1 и медленных запросов (core.querycheck): включается
+# в разработке, в тестах (core.test_runner) — строгий режим.
+QUERY_CHECK = os.getenv('QUERY_CHECK', str(DEBUG)).lower() in (
+    'true', '1', 'yes')
+QUERY_CHECK_STRICT = False
+QUERY_CHECK_REPEAT = int(os.getenv('QUERY_CHECK_REPEAT', 3))
+QUERY_CHECK_SLOW_MS = int(os.getenv('QUERY_CHECK_SLOW_MS', 100))
+TEST_RUNNER = 'core.test_runner.YatubeRunner'
+
+# Брокер уведомлений о новых постах (core.broker): LocalBroker
+# работает внутри процесса, CacheBroker — между процессами через кеш.
+PUBSUB_BACKEND = os.getenv('PUBSUB_BACKEND', 'core.broker.LocalBroker')
+# Поток SSE держит поток сервера, пока открыта вкладка, поэтому
+# включается только под ASGI (yatube/asgi.py). Без него страницы
+# каждые EVENTS_POLL_INTERVAL_MS спрашивают число постов новее
+# последнего увиденного. EVENTS_POLL_TIMEOUT > 0 превращает опрос
+# в long-poll: пустой ответ ждет новый пост столько секунд, занимая
+# поток сервера.
+EVENTS_STREAMING = os.getenv('EVENTS_STREAMING', 'false').lower() in (
+    'true', '1', 'yes')
+EVENTS_POLL_TIMEOUT = int(os.getenv('EVENTS_POLL_TIMEOUT', 0))
+EVENTS_POLL_INTERVAL_MS = 10000
+# Поток SSE: пауза переподключения браузера (мс), интервал
+# heartbeat и время жизни потока (с).
+EVENTS_RETRY_MS = 3000
+EVENTS_HEARTBEAT = 15
+EVENTS_STREAM_TIMEOUT = 300
+
+# Число потоков, в которых генерируются превью картинок постов.
+THUMBNAIL_WORKERS = 2
+
+# Варианты картинок постов для srcset: ширины и форматы в порядке
+# предпочтения. Форматы, которые не умеет записать Pillow, пропускаются.
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+
+# Загрузки всегда пишутся во временный файл на диске, а не в память.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Ограничения для картинок постов: размер файла, число пикселей
+# и максимальная сторона, до которой уменьшается оригинал.
+POST_IMAGE_MAX_BYTES = 10 * 2 ** 20
+POST_IMAGE_MAX_PIXELS = 40_000_000
+POST_IMAGE_MAX_SIDE = 2560
+
+# Картинка без постов удаляется, только если ее не загружали заново
+# столько секунд: дольше любой транзакции, сохраняющей пост.
+IMAGE_RELEASE_GRACE = 60 * 60
+
+# Сколько самых релевантных постов показывает поиск.
+SEARCH_RESULTS_LIMIT = 50
@@ -1,10 +1,16 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from core.views import (cache_stats, holes, prometheus_metrics,
+                        serve_immutable)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('cache-stats/', cache_stats, name='cache_stats'),
+    path('holes/', holes, name='holes'),
+    path('metrics', prometheus_metrics, name='metrics'),
+    path('api/v1/', include('api.urls', namespace='api')),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('', include('posts.urls', namespace='posts')),
@@ -16,6 +22,10 @@ handler500 = 'core.views.server_error'
 handler403 = 'core.views.permission_denied'
 
 if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
+    urlpatterns += [
+        re_path(
+            r'^{}(?P<path>.*)$'.format(settings.MEDIA_URL.lstrip('/')),
+            serve_immutable,
+            {'document_root': settings.MEDIA_ROOT}
+        ),
+    ]